@@ -9,15 +9,35 @@ except ImportError:
     class BaseHandler:
         pass
 
-from torch import load as torch_load, device as torch_device, argmax as torch_argmax, no_grad
+from torch import load as torch_load, device as torch_device, topk as torch_topk, no_grad, cat as torch_cat, from_numpy
+from torch import jit
 from torch.nn.functional import softmax
-from torchvision import transforms
 
 import numpy as np
 from pathlib import Path
 import json
+import os
+import warnings
 
 from OCR.OkraClassifier import OkraClassifier
+from OCR.exceptions import OkraModelError
+from OCR import payload
+
+
+# The frozen TorchScript model made by Training/modelExporter.py
+TORCHSCRIPT_FILENAME = 'okra.torchscript.pt'
+
+# The int8 TorchScript model made by Training/modelQuantizer.py
+INT8_FILENAME = 'okra.int8.pt'
+
+# The state dict of the eager model
+WEIGHTS_FILENAME = 'okra.resnet.weights'
+
+# The model that is loaded (see initialize)
+MODEL_FORMATS = ['torchscript', 'int8', 'eager']
+
+# The number of most probable digits returned as candidates for each image
+TOP_K = 3
 
 
 class OkraHandler(BaseHandler):
@@ -30,7 +50,19 @@ class OkraHandler(BaseHandler):
 
 
     def initialize(self, context=None):
-        """Initialize the model. This is called at the first handle request"""
+        """
+        Initialize the model. This is called at the first handle request.
+
+        The model is chosen by the OKRA_MODEL_FORMAT environment variable:
+            'torchscript' (default): The exported model, or the eager model if
+                                     it has not been exported.
+            'int8': The quantized model.
+            'eager': The PyTorch model built from its state dict.
+
+        Raises:
+            OkraModelError: The model format is unknown, or the int8 model is
+                            missing.
+        """
 
         if context is None:
 
@@ -41,23 +73,55 @@ class OkraHandler(BaseHandler):
             properties = context.system_properties
             model_dir = properties.get('model_dir')
 
+        model_format = os.environ.get('OKRA_MODEL_FORMAT', 'torchscript').lower()
+
+        if model_format not in MODEL_FORMATS:
+            raise OkraModelError(f'Unknown OKRA_MODEL_FORMAT: "{model_format}"')
+
         #
         # Init and load the model
         #
         device = 'cpu'
-        state_dict = torch_load(
-            Path(model_dir) / 'okra.resnet.weights',
-            weights_only=True,
-            map_location=torch_device(device)
-        )
-        self.model = OkraClassifier()
-        self.model.to(device)
-        self.model.load_state_dict(state_dict)
+        torchscript_path = Path(model_dir) / TORCHSCRIPT_FILENAME
+        int8_path = Path(model_dir) / INT8_FILENAME
+
+        if model_format == 'int8':
+
+            if not int8_path.is_file():
+                raise OkraModelError(f'The int8 model "{int8_path}" does not exist')
+
+            self.model = self.__load_torchscript(int8_path, device)
+
+        elif model_format == 'torchscript' and torchscript_path.is_file():
+
+            # The exported model loads faster and skips the Python overhead
+            # of the eager model
+            self.model = self.__load_torchscript(torchscript_path, device)
+
+        else:
+
+            state_dict = torch_load(
+                Path(model_dir) / WEIGHTS_FILENAME,
+                weights_only=True,
+                map_location=torch_device(device)
+            )
+            self.model = OkraClassifier()
+            self.model.to(device)
+            self.model.load_state_dict(state_dict)
+
         self.model.eval()
 
         self.initialized = True
 
 
+    def __load_torchscript(self, path, device):
+        """Loads a TorchScript model"""
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', FutureWarning)
+            return jit.load(path, map_location=torch_device(device))
+
+
     def __inference(self, image):
         """Runs the model with the image"""
 
@@ -67,41 +131,90 @@ class OkraHandler(BaseHandler):
         return logits
 
 
-    def __prepare_image(self, data):
-        """Extracts the image data and prepares it for the classifier"""
+    def __prepare_images(self, request):
+        """
+        Extracts the image data from a request and prepares it for the
+        classifier. A request holds a (N, 28, 28) array in the binary payload
+        format (see payload.py).
 
-        if not isinstance(data, dict):
-            data = data[0]
+        Returns:
+            torch.Tensor: A tensor with shape (N, 1, 28, 28).
+        """
 
-        raw_data = data.get("data")
-        # if preprocessed_data is None:
-        #     preprocessed_data = data.get("body")
+        raw_data = request.get("data")
 
-        img_shape = (int(data.get("y")), int(data.get("x")))
+        if raw_data is None:
+            raw_data = request.get("body")
 
-        im = np.frombuffer(raw_data, np.uint8)
+        return self.__scale_images(payload.decode(raw_data))
 
-        im = im.reshape(img_shape, copy=True)
 
-        transform = transforms.Compose([transforms.ToTensor(), transforms.Resize((28, 28))])
-        im = transform(im)
+    def __scale_images(self, images):
+        """
+        Converts a (N, 28, 28) array of images into the classifier's input.
 
-        im = im.reshape((1, 1, 28, 28))
+        Returns:
+            torch.Tensor: A tensor with shape (N, 1, 28, 28).
+        """
 
-        return im
+        if images.ndim != 3 or images.shape[1:] != (28, 28):
+            raise ValueError(f'Expected images with shape (N, 28, 28); Received {images.shape}')
+
+        # Scale the pixel values to the range [0, 1]
+        if images.dtype == np.uint8:
+            images = images.astype(np.float32) / 255.0
+
+        else:
+            images = images.astype(np.float32)
 
+        return from_numpy(images).unsqueeze(1)
 
-    def __process_output(self, ouptut):
-        """Converts logits into a prediction and confidence"""
+
+    def __process_output(self, output):
+        """
+        Converts logits into a prediction and confidence for each image, and
+        the TOP_K most probable digits as [digit, confidence] candidates
+        (the prediction first).
+        """
 
         # Convert the results into probabilities
-        probabilities = softmax(ouptut[0], dim=0)
+        probabilities = softmax(output, dim=1)
 
         # The index with the highest probability is the predicted value
-        digit_value = torch_argmax(probabilities)
-        confidence = probabilities[digit_value] * 100
+        top_probabilities, top_digits = torch_topk(probabilities, TOP_K, dim=1)
+
+        top_probabilities = (top_probabilities * 100).tolist()
+        top_digits = top_digits.tolist()
+
+        predictions = []
+
+        for digits, confidences in zip(top_digits, top_probabilities):
+
+            predictions.append({
+                "Digit": digits[0],
+                "Confidence": confidences[0],
+                "Candidates": [list(candidate) for candidate in zip(digits, confidences)]
+            })
+
+        return predictions
+
+
+    def predict(self, images):
+        """
+        Classifies images in this process, without the request encoding and
+        JSON responses of handle().
+
+        Parameters:
+            images (numpy.ndarray): The (N, 28, 28) images to classify.
+
+        Returns:
+            list(dict): The digit, confidence and candidates of each image.
+        """
+
+        if not self.initialized:
+            self.initialize()
 
-        return { "Digit": digit_value.item(), "Confidence": confidence.item() }
+        return self.__process_output(self.__inference(self.__scale_images(images)))
 
 
     def handle(self, data, context=None):
@@ -110,8 +223,48 @@ class OkraHandler(BaseHandler):
         if not self.initialized:
             self.initialize(context)
 
-        img = self.__prepare_image(data)
-        out = self.__inference(img)
-        prediction = self.__process_output(out)
+        # TorchServe passes a list of requests (more than one when dynamic
+        # batching is enabled). The debug path passes a single request.
+        if isinstance(data, dict):
+            data = [data]
+
+        imgs = []
+        counts = []
+        errors = {}
+
+        for i, request in enumerate(data):
+
+            # A malformed request only fails its own response, not the other
+            # requests in the batch
+            try:
+                request_imgs = self.__prepare_images(request)
+
+            except (TypeError, ValueError) as e:
+                errors[i] = str(e)
+                counts.append(0)
+                continue
+
+            imgs.append(request_imgs)
+            counts.append(request_imgs.shape[0])
+
+        predictions = []
+
+        if imgs:
+            # Run every image from every request in one forward pass
+            predictions = self.__process_output(self.__inference(torch_cat(imgs)))
+
+        # Split the predictions back up into one response per request
+        responses = []
+        offset = 0
+
+        for i, count in enumerate(counts):
+
+            if i in errors:
+                responses.append(payload.error_response(context, i, errors[i]))
+                continue
+
+            responses.append(json.dumps(predictions[offset:offset + count]) + '\n')
+            offset += count
+
+        return responses
 
-        return [json.dumps(prediction) + '\n']
@@ -0,0 +1,141 @@
+import numpy as np
+from pathlib import Path
+import os
+
+from .exceptions import OkraModelError
+
+
+# The ONNX model made by Training/modelExporter.py
+ONNX_FILENAME = 'okra.onnx'
+
+# The number of most probable digits returned as candidates for each image
+TOP_K = 3
+
+
+class OkraOnnxHandler:
+    """
+    Runs the exported OkraClassifier with ONNX Runtime on the CPU. It is a
+    drop-in replacement for OkraHandler.predict that does not need PyTorch.
+    It is only used in-process by DigitGetter, so it does not handle
+    TorchServe requests.
+    """
+
+    def __init__(self):
+
+        self.initialized = False
+
+
+    def initialize(self, model_dir=None, intra_op_threads=None):
+        """
+        Loads the ONNX model.
+
+        Parameters:
+            model_dir (str): The directory of the model (defaults to the
+                             weights directory of the OCR package).
+            intra_op_threads (int): The number of threads used to run each
+                                    batch (defaults to the OKRA_ONNX_THREADS
+                                    environment variable, or ONNX Runtime's
+                                    default if it is not set).
+
+        Raises:
+            OkraModelError: ONNX Runtime is not installed, or the model does
+                            not exist.
+        """
+
+        try:
+            import onnxruntime
+
+        except ImportError:
+            raise OkraModelError('The ONNX backend needs the onnxruntime package')
+
+        if model_dir is None:
+            model_dir = Path(__file__).parent / 'weights'
+
+        model_path = Path(model_dir) / ONNX_FILENAME
+
+        if not model_path.is_file():
+            raise OkraModelError(f'The ONNX model "{model_path}" does not exist')
+
+        if intra_op_threads is None and os.environ.get('OKRA_ONNX_THREADS'):
+            intra_op_threads = int(os.environ['OKRA_ONNX_THREADS'])
+
+        options = onnxruntime.SessionOptions()
+
+        if intra_op_threads is not None:
+            options.intra_op_num_threads = intra_op_threads
+
+        self.session = onnxruntime.InferenceSession(
+            str(model_path),
+            options,
+            providers=['CPUExecutionProvider']
+        )
+
+        self.input_name = self.session.get_inputs()[0].name
+
+        self.initialized = True
+
+
+    def __scale_images(self, images):
+        """
+        Converts a (N, 28, 28) array of images into the classifier's input.
+
+        Returns:
+            numpy.ndarray: A float32 array with shape (N, 1, 28, 28).
+        """
+
+        if images.ndim != 3 or images.shape[1:] != (28, 28):
+            raise ValueError(f'Expected images with shape (N, 28, 28); Received {images.shape}')
+
+        # Scale the pixel values to the range [0, 1]
+        if images.dtype == np.uint8:
+            images = images.astype(np.float32) / 255.0
+
+        else:
+            images = images.astype(np.float32)
+
+        return images[:, np.newaxis]
+
+
+    def __process_output(self, output):
+        """
+        Converts logits into a prediction and confidence for each image, and
+        the TOP_K most probable digits as candidates (see OkraHandler).
+        """
+
+        # Convert the results into probabilities (a numerically stable softmax)
+        exponents = np.exp(output - output.max(axis=1, keepdims=True))
+        probabilities = exponents / exponents.sum(axis=1, keepdims=True)
+
+        # The indices with the highest probabilities, most probable first.
+        # The first one is the predicted value.
+        top_digits = np.argsort(-probabilities, axis=1, kind='stable')[:, :TOP_K]
+        top_confidences = np.take_along_axis(probabilities, top_digits, axis=1) * 100
+
+        return [
+            {
+                "Digit": digits[0],
+                "Confidence": confidences[0],
+                "Candidates": [list(candidate) for candidate in zip(digits, confidences)]
+            }
+            for digits, confidences in zip(top_digits.tolist(), top_confidences.tolist())
+        ]
+
+
+    def predict(self, images):
+        """
+        Classifies images in this process.
+
+        Parameters:
+            images (numpy.ndarray): The (N, 28, 28) images to classify.
+
+        Returns:
+            list(dict): The digit, confidence and candidates of each image.
+        """
+
+        if not self.initialized:
+            self.initialize()
+
+        return self.__process_output(
+            self.session.run(None, {self.input_name: self.__scale_images(images)})[0]
+        )
+
@@ -0,0 +1,179 @@
+import time
+import torch
+from pathlib import Path
+
+from OCR.OkraClassifier import OkraClassifier
+
+
+#############################
+########## Options ##########
+
+weights_dir = Path(__file__).parent.parent / 'weights'
+input_weights_filename = 'okra.resnet.weights'
+output_model_filename = 'okra.torchscript.pt'
+output_onnx_filename = 'okra.onnx'
+
+# The batch sizes used to check and benchmark the exported model
+check_batch_sizes = [1, 16, 128]
+benchmark_repeats = 20
+
+#############################
+#############################
+
+
+def main():
+
+    # Load the eager model
+    model = load_eager_model()
+
+    # Export it
+    exported = export_model(model)
+    torch.jit.save(exported, weights_dir / output_model_filename)
+    print(f'Saved {weights_dir / output_model_filename}')
+
+    # Make sure the saved model gives the same results
+    exported = torch.jit.load(weights_dir / output_model_filename, map_location='cpu')
+    check_model(model, exported)
+
+    benchmark(model, exported)
+
+    # Export the ONNX model (for OkraOnnxHandler)
+    export_onnx_model(model, weights_dir / output_onnx_filename)
+    print(f'\nSaved {weights_dir / output_onnx_filename}')
+
+    check_onnx_model(model, weights_dir / output_onnx_filename)
+
+
+def load_eager_model():
+
+    state_dict = torch.load(
+        weights_dir / input_weights_filename,
+        weights_only=True,
+        map_location=torch.device('cpu')
+    )
+
+    model = OkraClassifier()
+    model.load_state_dict(state_dict)
+    model.eval()
+
+    return model
+
+
+def export_model(model):
+    """
+    Traces the model with a (N, 1, 28, 28) input and freezes it. Freezing
+    inlines the weights as constants and folds the batch norms into the
+    convolutions, so the exported model only runs the inference graph.
+    """
+
+    example = torch.zeros((check_batch_sizes[-1], 1, 28, 28))
+
+    with torch.no_grad():
+        traced = torch.jit.trace(model, example)
+
+    return torch.jit.freeze(traced)
+
+
+def export_onnx_model(model, path):
+    """
+    Exports the model to ONNX with a dynamic batch size, so it can be run by
+    ONNX Runtime without PyTorch.
+    """
+
+    example = torch.zeros((check_batch_sizes[-1], 1, 28, 28))
+
+    torch.onnx.export(
+        model,
+        (example,),
+        path,
+        input_names=['images'],
+        output_names=['logits'],
+        dynamic_shapes={'x': {0: torch.export.Dim('batch')}},
+        external_data=False
+    )
+
+
+def check_onnx_model(model, path):
+
+    try:
+        import onnxruntime
+
+    except ImportError:
+        print('onnxruntime is not installed; the ONNX model was not checked')
+        return
+
+    session = onnxruntime.InferenceSession(path, providers=['CPUExecutionProvider'])
+
+    for batch_size in check_batch_sizes:
+
+        images = torch.rand((batch_size, 1, 28, 28))
+
+        with torch.no_grad():
+            expected = model(images)
+
+        actual = torch.from_numpy(session.run(None, {'images': images.numpy()})[0])
+
+        max_error = (expected - actual).abs().max().item()
+        same_digits = torch.equal(expected.argmax(1), actual.argmax(1))
+
+        print(f'ONNX batch {batch_size:>3}: max logit error = {max_error:.2e} | same predictions = {same_digits}')
+
+
+def check_model(model, exported):
+
+    for batch_size in check_batch_sizes:
+
+        images = torch.rand((batch_size, 1, 28, 28))
+
+        with torch.no_grad():
+            expected = model(images)
+            actual = exported(images)
+
+        max_error = (expected - actual).abs().max().item()
+        same_digits = torch.equal(expected.argmax(1), actual.argmax(1))
+
+        print(f'Batch {batch_size:>3}: max logit error = {max_error:.2e} | same predictions = {same_digits}')
+
+
+def benchmark(model, exported):
+
+    # Load times
+    start = time.perf_counter()
+    load_eager_model()
+    eager_load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    torch.jit.load(weights_dir / output_model_filename, map_location='cpu')
+    exported_load = time.perf_counter() - start
+
+    print(f'\nLoad time: eager = {eager_load * 1000:.1f} ms | exported = {exported_load * 1000:.1f} ms')
+
+    # Inference times
+    for batch_size in check_batch_sizes:
+
+        images = torch.rand((batch_size, 1, 28, 28))
+
+        eager_time = time_inference(model, images)
+        exported_time = time_inference(exported, images)
+
+        print(f'Batch {batch_size:>3}: eager = {eager_time * 1000:.2f} ms | exported = {exported_time * 1000:.2f} ms')
+
+
+def time_inference(model, images):
+
+    with torch.no_grad():
+
+        # Warm up (the first runs of a TorchScript model are optimized)
+        for _ in range(3):
+            model(images)
+
+        start = time.perf_counter()
+
+        for _ in range(benchmark_repeats):
+            model(images)
+
+    return (time.perf_counter() - start) / benchmark_repeats
+
+
+if __name__=='__main__':
+    main()
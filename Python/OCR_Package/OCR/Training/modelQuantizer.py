@@ -0,0 +1,214 @@
+import copy
+import time
+import torch
+import torchvision
+import torchvision.transforms as transforms
+from torch.ao.quantization import get_default_qconfig_mapping
+from torch.ao.quantization.quantize_fx import prepare_fx, convert_fx
+from torch.utils.data import DataLoader
+from pathlib import Path
+
+from OCR.OkraClassifier import OkraClassifier
+
+
+#############################
+########## Options ##########
+
+weights_dir = Path(__file__).parent.parent / 'weights'
+input_weights_filename = 'okra.resnet.weights'
+output_model_filename = 'okra.int8.pt'
+
+use_extended_MNIST = True
+
+# 'x86' (or 'fbgemm') for x86 servers, 'qnnpack' for ARM servers
+quantized_engine = 'x86'
+
+# The number of training batches used to calibrate the activation ranges
+batch_size = 500
+calibration_batches = 20
+
+# The batch sizes used to benchmark the quantized model
+benchmark_batch_sizes = [1, 16, 128]
+benchmark_repeats = 20
+
+# Transformations to be applied to the images (the same as for testing)
+transform = transforms.Compose([
+    transforms.ToTensor()
+])
+
+#############################
+#############################
+
+
+def main():
+
+    torch.backends.quantized.engine = quantized_engine
+
+    # Get data
+    calibration_data, test_data = prepare_data()
+
+    # Get the full precision model
+    model = load_eager_model()
+
+    # Quantize it and save it as a frozen TorchScript model
+    quantized = quantize_model(model, calibration_data)
+    exported = export_model(quantized)
+
+    torch.jit.save(exported, weights_dir / output_model_filename)
+    print(f'Saved {weights_dir / output_model_filename}')
+
+    exported = torch.jit.load(weights_dir / output_model_filename, map_location='cpu')
+
+    # Compare the accuracy
+    float_accuracy = test(model, test_data)
+    int8_accuracy = test(exported, test_data)
+
+    print(f'\nAccuracy: float32 = {float_accuracy:.2f}% | int8 = {int8_accuracy:.2f}% | delta = {int8_accuracy - float_accuracy:+.2f}%')
+
+    benchmark(model, exported)
+
+
+def apply_transforms(examples):
+
+    examples['image'] = [transform(image) for image in examples['image']]
+    return examples
+
+
+def prepare_data():
+
+    if use_extended_MNIST:
+
+        from datasets import load_dataset
+
+        emnist = load_dataset('ernestchu/emnist-digits')
+        train = emnist['train']
+        test = emnist['test']
+        train.set_transform(apply_transforms, columns=['image', 'label'])
+        test.set_transform(apply_transforms, columns=['image', 'label'])
+
+    else:
+
+        train = torchvision.datasets.MNIST('./data', train=True, download=True, transform=transform)
+        test = torchvision.datasets.MNIST('./data', train=False, download=True, transform=transform)
+
+    # Calibrate on a random sample of the training images
+    calibration_loader = DataLoader(train, shuffle=True, batch_size=batch_size)
+    test_loader = DataLoader(test, shuffle=False, batch_size=batch_size)
+
+    return calibration_loader, test_loader
+
+
+def get_images(batch):
+
+    if use_extended_MNIST:
+        return batch['image'], batch['label']
+
+    return batch
+
+
+def load_eager_model():
+
+    state_dict = torch.load(
+        weights_dir / input_weights_filename,
+        weights_only=True,
+        map_location=torch.device('cpu')
+    )
+
+    model = OkraClassifier()
+    model.load_state_dict(state_dict)
+    model.eval()
+
+    return model
+
+
+def quantize_model(model, calibration_data):
+    """
+    Statically quantizes the model to int8 with FX graph mode quantization.
+    The batch norms are fused into the convolutions, and the range of every
+    activation is measured on the calibration images.
+    """
+
+    example = torch.zeros((1, 1, 28, 28))
+
+    prepared = prepare_fx(
+        copy.deepcopy(model),
+        get_default_qconfig_mapping(quantized_engine),
+        (example,)
+    )
+
+    with torch.no_grad():
+        for batch_num, batch in enumerate(calibration_data):
+
+            if batch_num >= calibration_batches:
+                break
+
+            x_batch, _ = get_images(batch)
+            prepared(x_batch)
+
+    return convert_fx(prepared)
+
+
+def export_model(quantized):
+    """Traces and freezes the quantized model, like modelExporter.py"""
+
+    example = torch.zeros((benchmark_batch_sizes[-1], 1, 28, 28))
+
+    with torch.no_grad():
+        traced = torch.jit.trace(quantized, example)
+
+    return torch.jit.freeze(traced)
+
+
+def test(model, data):
+
+    total_correct = 0
+    total_count = 0
+
+    with torch.no_grad():
+        for batch in data:
+
+            x_batch, y_batch = get_images(batch)
+
+            pred = model(x_batch)
+
+            correct_pred = torch.argmax(pred, 1) == y_batch
+            total_correct += correct_pred.float().sum().item()
+            total_count += len(y_batch)
+
+    return 100.0 * total_correct / total_count
+
+
+def benchmark(model, quantized):
+
+    for batch_size in benchmark_batch_sizes:
+
+        images = torch.rand((batch_size, 1, 28, 28))
+
+        float_time = time_inference(model, images)
+        int8_time = time_inference(quantized, images)
+
+        print(
+            f'Batch {batch_size:>3}: '
+            f'float32 = {float_time * 1000:7.2f} ms ({batch_size / float_time:7.0f} images/s) | '
+            f'int8 = {int8_time * 1000:7.2f} ms ({batch_size / int8_time:7.0f} images/s)'
+        )
+
+
+def time_inference(model, images):
+
+    with torch.no_grad():
+
+        # Warm up (the first runs of a TorchScript model are optimized)
+        for _ in range(3):
+            model(images)
+
+        start = time.perf_counter()
+
+        for _ in range(benchmark_repeats):
+            model(images)
+
+    return (time.perf_counter() - start) / benchmark_repeats
+
+
+if __name__=='__main__':
+    main()
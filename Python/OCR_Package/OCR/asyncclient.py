@@ -0,0 +1,152 @@
+#
+# An asynchronous HTTP client for TorchServe
+#
+
+import asyncio
+import atexit
+import threading
+
+from .exceptions import OkraModelError
+from . import payload
+
+
+# The response codes that are retried (the same as the synchronous client)
+RETRY_STATUS_CODES = [502, 503, 504]
+
+
+class AsyncTorchServeClient:
+    """
+    Sends prediction requests to TorchServe without waiting for them. The
+    requests run on an event loop in a background thread, so the caller can
+    keep segmenting images while earlier digits are being classified.
+
+    The event loop and its HTTP session live as long as the client, so the
+    connections are kept alive between scoresheets.
+    """
+
+    def __init__(self, url, max_in_flight=4, timeout=(3.0, 30.0), retries=2):
+        """
+        Creates a client and starts its event loop.
+
+        Parameters:
+            url (str): The base URL of the TorchServe inference API.
+            max_in_flight (int): The max number of requests that are sent at
+                                 the same time. The rest wait for a slot.
+            timeout ((float, float)): The connect and read timeouts in
+                                      seconds for each request.
+            retries (int): The number of times a failed request is retried.
+
+        Raises:
+            OkraModelError: aiohttp is not installed.
+        """
+
+        try:
+            import aiohttp
+
+        except ImportError:
+            raise OkraModelError('The asynchronous TorchServe client needs the aiohttp package')
+
+        self.__aiohttp = aiohttp
+        self.url = url.rstrip('/')
+        self.max_in_flight = max_in_flight
+        self.timeout = timeout
+        self.retries = retries
+
+        self.__session = None
+        self.__semaphore = None
+
+        self.__loop = asyncio.new_event_loop()
+        self.__thread = threading.Thread(target=self.__loop.run_forever, daemon=True)
+        self.__thread.start()
+
+        # Close the connections cleanly when the process exits
+        atexit.register(self.close)
+
+
+    def submit(self, model_name, batch):
+        """
+        Starts a prediction request.
+
+        Parameters:
+            model_name (str): The name of the target model.
+            batch (numpy.ndarray): The (N, 28, 28) images to classify.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the model's results (one
+                                       per image). Its result() raises
+                                       OkraModelError if the request failed.
+        """
+
+        data = payload.encode(batch)
+
+        return asyncio.run_coroutine_threadsafe(self.__predict(model_name, data), self.__loop)
+
+
+    def close(self):
+        """Closes the HTTP session and stops the event loop"""
+
+        if self.__loop.is_closed():
+            return
+
+        if self.__session is not None:
+            asyncio.run_coroutine_threadsafe(self.__session.close(), self.__loop).result()
+
+        self.__loop.call_soon_threadsafe(self.__loop.stop)
+        self.__thread.join()
+        self.__loop.close()
+
+
+    async def __predict(self, model_name, data):
+        """Sends one request, retrying failures with a short backoff"""
+
+        aiohttp = self.__aiohttp
+
+        if self.__session is None:
+
+            # These have to be created on the event loop's thread
+            self.__semaphore = asyncio.Semaphore(self.max_in_flight)
+            self.__session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_in_flight),
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=self.timeout[0],
+                    sock_read=self.timeout[1]
+                )
+            )
+
+        attempt = 0
+
+        async with self.__semaphore:
+            while True:
+
+                try:
+                    async with self.__session.post(
+                        f'{self.url}/predictions/{model_name}',
+                        data=data,
+                        headers={'Content-Type': payload.CONTENT_TYPE}
+                    ) as response:
+
+                        if response.status in RETRY_STATUS_CODES and attempt < self.retries:
+                            raise aiohttp.ClientResponseError(
+                                response.request_info, (), status=response.status
+                            )
+
+                        body = await response.json(content_type=None)
+
+                        if response.status != 200:
+                            raise OkraModelError(
+                                f'TorchServe could not process the request: {body}'
+                            )
+
+                        return body
+
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+
+                    if attempt >= self.retries:
+
+                        if isinstance(e, asyncio.TimeoutError):
+                            raise OkraModelError(f'TorchServe request timed out: {e}')
+
+                        raise OkraModelError(f'Unable to connect to TorchServe: {e}')
+
+                    await asyncio.sleep(0.1 * 2**attempt)
+                    attempt += 1
@@ -1,10 +1,14 @@
 import numpy as np
 import cv2
 from enum import IntEnum
+from itertools import repeat
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import os
 
 from .exceptions import *
+from . import payload
 
 try:
     import matplotlib.pyplot as plt
@@ -39,20 +43,92 @@ class DigitGetter:
                                     have to be filled-in to be considered a
                                     scribbled out number that should be ignored
                                     (default=80.0).
+        digit_candidates (bool): Also return the classifier's most probable
+                                 digits for each digit in images_to_digits,
+                                 so the validation can pick another one
+                                 (see violin) (default=False).
+        check_line_issues (bool): Check each segment for handwriting
+                                  that touches a ruling line, and trace the
+                                  digits again without the line. This can be
+                                  turned off if the lines were already
+                                  removed (default=True).
+        segmentation_mode (str): The algorithm used to find handwriting
+                                 segments. Either 'trace' (follow the edges
+                                 of each piece of handwriting) or
+                                 'components' (OpenCV connected components)
+                                 (default='trace').
+        backend (str): Where the classifier runs: 'local', 'onnx', or
+                       'torchserve' (set by the constructor).
+        ts_url (str): The base URL of the TorchServe inference API (default is
+                      the TORCHSERVE_URL environment variable or
+                      http://localhost:6060).
+        ts_pool_size (int): The max number of keep-alive connections to
+                            TorchServe (default=4).
+        ts_timeout ((float, float)): The connect and read timeouts in seconds
+                                     for TorchServe requests
+                                     (default=(3.0, 30.0)).
+        ts_retries (int): The number of times a failed TorchServe request is
+                          retried (default=2).
+        ts_async (bool): Send the digits to TorchServe in chunks while the
+                         rest of the images are still being segmented, with
+                         up to ts_pool_size requests in flight. This needs
+                         the aiohttp package (default is True if the
+                         TORCHSERVE_ASYNC environment variable is 'true').
+        ts_chunk_size (int): The number of digits in each request when
+                             ts_async is set (default=32).
+        executor (concurrent.futures.Executor): Segments the images passed to
+                                                images_to_digits concurrently
+                                                with a thread pool. Most of
+                                                the OpenCV calls release the
+                                                GIL (default=None, one image
+                                                at a time).
     """
 
-    def __init__(self, ts=False):
-        """Creates a new instance of DigitGetter"""
+    def __init__(self, ts=False, backend=None):
+        """
+        Creates a new instance of DigitGetter
 
-        self.__debug = not ts
+        Parameters:
+            ts (bool): Send the images to TorchServe (the same as
+                       backend='torchserve').
+            backend (str): Where the classifier runs. Either 'local'
+                           (in-process PyTorch), 'onnx' (in-process ONNX
+                           Runtime, without PyTorch), or 'torchserve'.
+                           Defaults to 'torchserve' if ts is set, otherwise
+                           to the OKRA_BACKEND environment variable, or
+                           'local'.
 
-        if self.__debug:
+        Raises:
+            ValueError: Unknown backend.
+        """
+
+        if backend is None:
+            backend = 'torchserve' if ts else os.environ.get('OKRA_BACKEND', 'local').lower()
+
+        if backend not in ('local', 'onnx', 'torchserve'):
+            raise ValueError(f'Unknown backend: "{backend}"')
+
+        self.backend = backend
+
+        # The classifier runs in this process (only TorchServe is remote)
+        self.__debug = backend != 'torchserve'
+        self.__session = None
+        self.__async_client = None
+
+        if backend == 'local':
 
             from .OkraHandler import OkraHandler
 
             self.__classifier_handle = OkraHandler()
             self.__classifier_handle.initialize()
 
+        elif backend == 'onnx':
+
+            from .OkraOnnxHandler import OkraOnnxHandler
+
+            self.__classifier_handle = OkraOnnxHandler()
+            self.__classifier_handle.initialize()
+
         self.__tracer = OkraTracer()
 
         # Set default attributes
@@ -65,6 +141,16 @@ class DigitGetter:
         self.blank_threshold = 120
         self.use_width_as_reference = False
         self.scribble_threshold = 80.0
+        self.digit_candidates = False
+        self.check_line_issues = True
+        self.segmentation_mode = 'trace'
+        self.ts_url = os.environ.get('TORCHSERVE_URL', 'http://localhost:6060')
+        self.ts_pool_size = 4
+        self.ts_timeout = (3.0, 30.0)
+        self.ts_retries = 2
+        self.ts_async = os.environ.get('TORCHSERVE_ASYNC', '').lower() == 'true'
+        self.ts_chunk_size = 32
+        self.executor = None
 
 
     def __preprocess_image(self, img):
@@ -82,26 +168,107 @@ class DigitGetter:
         if img.ndim == 3 and img.shape[2] == 3:
             img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
 
-        # If there is a number in the image, there
-        # will be a large difference between the
-        # brightest pixel and the darkest pixel
-        if (img.max() - img.min() <= self.blank_threshold):
+        if self.is_blank(img):
             raise OkraBlankSegmentException
 
+        img = self.__binarize(img, np.empty_like(img))
+
+        self.__show_debug_image(img, 'Pre-processed Image')
+
+        return img
+
+
+    def __binarize(self, img, out):
+        """
+        Separates the handwriting from the background of a grayscale image.
+
+        Parameters:
+            img (numpy.ndarray): The grayscale image.
+            out (numpy.ndarray): Where the binary image is written (the same
+                                 shape as img, but not the same memory).
+
+        Returns:
+            numpy.ndarray: out.
+        """
+
         # Apply a slight blur
-        img = cv2.bilateralFilter(img, 5, self.blank_threshold, 20)
+        cv2.bilateralFilter(img, 5, self.blank_threshold, 20, dst=out)
 
         # Apply threshold
-        _, img = cv2.threshold(
-            img, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU
+        cv2.threshold(
+            out, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU, dst=out
         )
 
         # Perform dilation to make digits stand out better
-        img = cv2.dilate(img, (3, 3), iterations=1)
+        cv2.dilate(out, (3, 3), dst=out, iterations=1)
 
-        self.__show_debug_image(img, 'Pre-processed Image')
+        return out
 
-        return img
+
+    def preprocess_images(self, imgs):
+        """
+        Pre-processes all the fields of a page at once. Each image is
+        converted to grayscale and binarized the same way as by
+        images_to_digits, but into two buffers that are shared by every
+        field, and each image is only converted once.
+
+        Parameters:
+            imgs (list(numpy.ndarray)): Grayscale or BGR images.
+
+        Returns:
+            list(numpy.ndarray): The binary image of each field (views into
+                                 the shared buffer), or None if the field is
+                                 blank. Pass these to images_to_digits with
+                                 preprocessed=True.
+        """
+
+        sizes = [img.shape[0] * img.shape[1] for img in imgs]
+
+        gray_buffer = np.empty(sum(sizes), dtype=np.uint8)
+        binary_buffer = np.empty(sum(sizes), dtype=np.uint8)
+
+        binary_imgs = []
+        offset = 0
+
+        for img, size in zip(imgs, sizes):
+
+            shape = img.shape[:2]
+            buffer_slice = slice(offset, offset + size)
+            offset += size
+
+            if img.ndim == 3 and img.shape[2] == 3:
+                img = cv2.cvtColor(
+                    img, cv2.COLOR_BGR2GRAY, dst=gray_buffer[buffer_slice].reshape(shape)
+                )
+
+            if self.is_blank(img):
+                binary_imgs.append(None)
+                continue
+
+            binary_imgs.append(self.__binarize(img, binary_buffer[buffer_slice].reshape(shape)))
+
+        return binary_imgs
+
+
+    def is_blank(self, img):
+        """
+        Checks if an image is too uniform to contain any handwriting. This is
+        much faster than segmenting it.
+
+        Parameters:
+            img (numpy.ndarray): A grayscale or BGR image.
+
+        Returns:
+            bool: True if the image is blank (see blank_threshold).
+        """
+
+        if img.ndim == 3 and img.shape[2] == 3:
+            img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+        # If there is a number in the image, there
+        # will be a large difference between the
+        # brightest pixel and the darkest pixel
+        return img.max() - img.min() <= self.blank_threshold
 
 
     def digit_from_image(self, img):
@@ -140,11 +307,7 @@ class DigitGetter:
                           a percentage.
         """
 
-        self.__show_debug_image(img, 'Digit')
-
-        body = self.__send_to_model('OkraClassifier', img)
-
-        return (body['Digit'], body['Confidence'])
+        return self.__classify_digits([img], padding=False)[0][:2]
 
 
     def image_to_digits(self, img, expected_digit_count=None):
@@ -160,18 +323,230 @@ class DigitGetter:
 
         Returns:
             (list(int), list(float)): A tuple with a list of digit values and
-                                      a list of confidences as percentages.
+                                      a list of confidences as percentages
+                                      (and the candidates if digit_candidates
+                                      is set, see images_to_digits).
 
         Raises:
             OkraModelError: Failed to run a model.
             TypeError: The expected digit count cannot be zero or negative.
         """
 
-        try:
-            img = self.__preprocess_image(img)
+        return self.images_to_digits([img], [expected_digit_count])[0]
 
-        except OkraBlankSegmentException:
-            return ([], [])
+
+    def images_to_digits(self, imgs, expected_digit_counts=None, preprocessed=False):
+        """
+        Extracts a line of digits from each image in a list. All the images
+        are segmented first, and then every digit is classified by a single
+        call to the model.
+
+        Parameters:
+            imgs (list(numpy.ndarray)): Images containing some digits (e.g.
+                                        every score-field of a scoresheet).
+            expected_digit_counts (list(int)): The number of digits that are
+                                               expected to be in each image
+                                               (see image_to_digits). By
+                                               default, this is disabled for
+                                               all images (Default=None).
+            preprocessed (bool): The images were already pre-processed by
+                                 preprocess_images (Default=False).
+
+        Returns:
+            list((list(int), list(float))): One tuple per image (in the same
+                                            order as imgs) with a list of digit
+                                            values and a list of confidences
+                                            as percentages. If digit_candidates
+                                            is set, each tuple also has a list
+                                            of the candidates for each value
+                                            (None for decimal points and minus
+                                            signs).
+
+        Raises:
+            OkraModelError: Failed to run a model.
+            TypeError: The expected digit count cannot be zero or negative.
+        """
+
+        if expected_digit_counts is None:
+            expected_digit_counts = [None] * len(imgs)
+
+        # With the asynchronous client, full chunks of digits are sent while
+        # the remaining images are segmented
+        send_chunks = self.ts_async and not self.__debug
+
+        segment_lists = []
+        digit_images = []
+        chunk_futures = []
+        first_unsent = 0
+
+        # The segments are returned in the same order as the images
+        segment_map = map if self.executor is None else self.executor.map
+
+        # Segment every image before running the classifier
+        for segments in segment_map(
+            self.__segment_image, imgs, expected_digit_counts, repeat(preprocessed)
+        ):
+
+            segment_lists.append(segments)
+
+            digit_images.extend(
+                segment['img']
+                for segment in segments
+                if segment['type'] == SegmentType.DIGIT
+            )
+
+            while send_chunks and len(digit_images) - first_unsent >= self.ts_chunk_size:
+
+                chunk = digit_images[first_unsent:first_unsent + self.ts_chunk_size]
+                chunk_futures.append(self.__submit_to_model('OkraClassifier', chunk))
+                first_unsent += self.ts_chunk_size
+
+        if send_chunks:
+
+            if first_unsent < len(digit_images):
+                chunk_futures.append(
+                    self.__submit_to_model('OkraClassifier', digit_images[first_unsent:])
+                )
+
+            # Wait for every chunk (in order)
+            predictions = iter([
+                self.__read_prediction(p)
+                for future in chunk_futures
+                for p in future.result()
+            ])
+
+        else:
+
+            # Classify all the digits at once
+            predictions = iter(self.__classify_digits(digit_images))
+
+        outputs = []
+
+        for segments in segment_lists:
+
+            # The return values for this image
+            numbers = []
+            confidence = []
+            candidates = []
+
+            # Process all the segments found earlier
+            for segment in segments:
+
+                if segment['type'] == SegmentType.DIGIT:
+
+                    num, conf, digit_candidates = next(predictions)
+                    numbers.append(num)
+                    confidence.append(conf)
+                    candidates.append(digit_candidates)
+
+                elif segment['type'] == SegmentType.DECIMAL:
+
+                    if self.find_decimal_points:
+                        conf = self.__get_decimal_confidence(segment['img'].shape)
+                        numbers.append('.')
+                        confidence.append(conf)
+                        candidates.append(None)
+
+                    self.__show_debug_image(segment['img'], 'Decimal Point')
+
+                elif segment['type'] == SegmentType.MINUS:
+
+                    if self.find_minus_signs:
+                        conf = self.__get_decimal_confidence(segment['img'].shape)
+                        numbers.append('-')
+                        confidence.append(100.0 - conf)
+                        candidates.append(None)
+
+                    self.__show_debug_image(segment['img'], 'Minus Symbol')
+
+                else:
+                    self.__show_debug_image(segment['img'], 'Ignored')
+
+            if self.digit_candidates:
+                outputs.append((numbers, confidence, candidates))
+            else:
+                outputs.append((numbers, confidence))
+
+        return outputs
+
+
+    def __segment_image(self, img, expected_digit_count, preprocessed=False):
+        """
+        Pre-processes an image and segments out all the pieces of handwriting.
+
+        Parameters:
+            img (numpy.ndarray): An image containing some digits.
+            expected_digit_count (int): The number of digits that are expected
+                                        to be in the image (or None).
+            preprocessed (bool): The image is already binary (or None if it is
+                                 blank), see preprocess_images.
+
+        Returns:
+            list(dict): The segments found in the image (see __get_segment).
+                        The list is empty if the image is blank.
+
+        Raises:
+            TypeError: The expected digit count cannot be zero or negative.
+        """
+
+        if preprocessed:
+
+            if img is None:
+                return []
+
+        else:
+
+            try:
+                img = self.__preprocess_image(img)
+
+            except OkraBlankSegmentException:
+                return []
+
+        if self.segmentation_mode == 'components':
+
+            segments = self.__get_component_segments(img)
+
+        elif self.segmentation_mode == 'trace':
+
+            segments = self.__get_traced_segments(img)
+
+        else:
+            raise ValueError(f'Unknown segmentation mode: "{self.segmentation_mode}"')
+
+
+        # Check for overlapped digits
+        if expected_digit_count is not None:
+            if expected_digit_count <= 0:
+                raise TypeError(
+                    f'The expected digit count must be a postive integer. \
+                    Received: {expected_digit_count}'
+                )
+
+            is_digit = lambda x: x['type'] == SegmentType.DIGIT
+
+            number_of_digits = len(list(filter(is_digit, segments)))
+
+            while number_of_digits < expected_digit_count:
+
+                if not self.__split_digit(segments):
+                    break
+
+                number_of_digits += 1
+
+        return segments
+
+
+    def __get_traced_segments(self, img):
+        """
+        Segments out all the pieces of handwriting by scanning the image
+        columns and tracing the edges of each piece that is found.
+
+        Parameters:
+            img (numpy.ndarray): A pre-processed image.
+
+        Returns:
+            list(dict): The segments found in the image (see __get_segment).
+        """
 
         # A dictionary to save the state of the scan
         scan_state = {}
@@ -197,64 +572,113 @@ class DigitGetter:
             # Add this segment to the list
             segments.append(segment)
 
+        return segments
 
-        # Check for overlapped digits
-        if expected_digit_count is not None:
-            if expected_digit_count <= 0:
-                raise TypeError(
-                    f'The expected digit count must be a postive integer. \
-                    Received: {expected_digit_count}'
-                )
 
-            is_digit = lambda x: x['type'] == SegmentType.DIGIT
+    def __get_component_segments(self, img):
+        """
+        Segments out all the pieces of handwriting using the bounding boxes of
+        the image's connected components. The same line-issue rules as the
+        tracer are applied to each box (see OkraTracer).
 
-            number_of_digits = len(list(filter(is_digit, segments)))
+        Parameters:
+            img (numpy.ndarray): A pre-processed image.
 
-            while number_of_digits < expected_digit_count:
+        Returns:
+            list(dict): The segments found in the image (see __get_segment),
+                        ordered from left to right.
+        """
 
-                if not self.__split_digit(segments):
-                    break
+        boxes = []
+        self.__find_component_boxes(img != 0, img.shape, boxes, 0)
 
-                number_of_digits += 1
+        # Order the segments the way they would be read
+        boxes.sort(key=lambda box: (box.left, box.top))
 
+        segments = []
 
-        # The return values
-        numbers = []
-        confidence = []
+        for bounds in boxes:
 
-        # Process all the segments found earlier
-        for segment in segments:
+            segment = bounds.get_slice(img)
+            segment_type = self.__get_segment_type(segment, img.shape)
 
-            if segment['type'] == SegmentType.DIGIT:
+            segments.append({'img': segment, 'type': segment_type})
 
-                self.__process_digit_segment(
-                    segment['img'],
-                    numbers,
-                    confidence
-                )
+        return segments
 
-            elif segment['type'] == SegmentType.DECIMAL:
 
-                if self.find_decimal_points:
-                    conf = self.__get_decimal_confidence(segment['img'].shape)
-                    numbers.append('.')
-                    confidence.append(conf)
+    def __find_component_boxes(self, mask, img_shape, boxes, depth):
+        """
+        Finds the bounding boxes of the connected components in a mask. A
+        component that is a line touching some digits is split into the line
+        and the digits.
 
-                self.__show_debug_image(segment['img'], 'Decimal Point')
+        Parameters:
+            mask (numpy.ndarray): A boolean image where handwriting is True.
+            img_shape (int, int): The shape of the original image.
+            boxes (list(Boundary)): The list that the boxes are added to.
+            depth (int): The number of times the mask has been split.
+        """
 
-            elif segment['type'] == SegmentType.MINUS:
+        count, labels, stats, _ = cv2.connectedComponentsWithStats(
+            mask.view(np.uint8), connectivity=8
+        )
 
-                if self.find_minus_signs:
-                    conf = self.__get_decimal_confidence(segment['img'].shape)
-                    numbers.append('-')
-                    confidence.append(100.0 - conf)
+        half = img_shape[0] // 2
+        line_threshold = img_shape[1] // 3
 
-                self.__show_debug_image(segment['img'], 'Minus Symbol')
+        for label in range(1, count):
 
-            else:
-                self.__show_debug_image(segment['img'], 'Ignored')
+            left, top, width, height, _ = stats[label]
+            bounds = Boundary(top, left + width - 1, top + height - 1, left)
+
+            # Check for the digit-touching-line issue (unless the lines were
+            # already removed). The row projection of the component plays the
+            # role of the tracer's 'layers'.
+            if self.check_line_issues and depth < 2 and \
+               bounds.top < half and bounds.bottom > half:
+
+                component = labels[bounds.top:bounds.bottom + 1,
+                                   bounds.left:bounds.right + 1] == label
+                layers = np.count_nonzero(component, axis=1)
+
+                line_rows = np.flatnonzero(layers >= line_threshold) + bounds.top
+
+                top_rows = line_rows[line_rows < half]
+                bottom_rows = line_rows[line_rows >= half]
+
+                if len(top_rows) > 0:
+                    print('OCR Line Issue Detected! - Removing line from above')
+                    line_top, line_bottom = top_rows[0], top_rows[-1]
+
+                elif len(bottom_rows) > 0:
+                    print('OCR Line Issue Detected! - Removing line from below')
+                    line_top, line_bottom = bottom_rows[0], bottom_rows[-1]
+
+                else:
+                    line_top = None
+
+                if line_top is not None:
+
+                    # Keep the line as its own segment
+                    boxes.append(
+                        Boundary(line_top, bounds.right, line_bottom, bounds.left)
+                    )
+
+                    # Segment whatever is left of the component without the
+                    # line rows
+                    remainder = np.zeros_like(mask)
+                    remainder[bounds.top:bounds.bottom + 1,
+                              bounds.left:bounds.right + 1] = component
+                    remainder[line_top:line_bottom + 1] = False
 
-        return (numbers, confidence)
+                    self.__find_component_boxes(
+                        remainder, img_shape, boxes, depth + 1
+                    )
+
+                    continue
+
+            boxes.append(bounds)
 
 
     def __scan_columns(self, img, scan_state):
@@ -342,7 +766,7 @@ class DigitGetter:
 
         # Find the actual boundary of the digit.
         # 'bounds' will be updated with the correct values.
-        self.__tracer.trace(img, bounds, start_pixel, scan_state)
+        self.__tracer.trace(img, bounds, start_pixel, scan_state, self.check_line_issues)
 
         # Update the scan state
         if bounds.bottom < img.shape[0] // 2:
@@ -515,33 +939,72 @@ class DigitGetter:
         # pad on the x dimension (add more columns than rows).
         #
         if (img.shape[0] <= img.shape[1]):
-            img = np.pad(img, (dynamic_pad, fixed_pad))
+            vertical_pad, horizontal_pad = dynamic_pad, fixed_pad
         else:
-            img = np.pad(img, (fixed_pad, dynamic_pad))
+            vertical_pad, horizontal_pad = fixed_pad, dynamic_pad
 
-        return img
+        # The same as np.pad with zeros, but faster
+        return cv2.copyMakeBorder(
+            img, *vertical_pad, *horizontal_pad, cv2.BORDER_CONSTANT, value=0
+        )
 
 
-    def __process_digit_segment(self, digit_segment, numbers, confidence):
+    def __classify_digits(self, digit_images, padding=True):
         """
-        Applies padding to a digit segment and sends it to the image
-        classifier.
+        Sends a batch of digit images to the image classifier.
 
         Parameters:
-            digit_segment (numpy.ndarray): An image segment containing a digit.
-            numbers (list(int)): The list where the image classifier's result
-                                 will be placed.
-            confidence (list(float)): The list where the image classifier's
-                                      confidence will be placed.
+            digit_images (list(numpy.ndarray)): Images that each contain a
+                                                single digit.
+            padding (bool): Pad the images to a square first (see
+                            __normalize_digits).
+
+        Returns:
+            list((int, float, list)): A tuple with the digit's value, the
+                                      confidence as a percentage, and the
+                                      candidates (see __read_prediction) for
+                                      each image.
+
+        Raises:
+            OkraModelError: Failed to run a model.
         """
 
-        # Prepare the segment
-        digit_segment = self.__apply_padding(digit_segment)
+        if len(digit_images) == 0:
+            return []
+
+        batch = self.__normalize_digits(digit_images, padding)
+
+        for digit_image in batch:
+            self.__show_debug_image(digit_image, 'Digit')
+
+        body = self.__send_to_model('OkraClassifier', batch)
+
+        return [self.__read_prediction(p) for p in body]
 
-        # Classify the digit
-        num, conf = self.__digit_from_image(digit_segment)
-        numbers.append(num)
-        confidence.append(conf)
+
+    def __read_prediction(self, prediction):
+        """
+        Reads one of the classifier's predictions.
+
+        Returns:
+            (int, float, list((int, float))): The digit, its confidence, and
+                                              the most probable digits with
+                                              their confidences (the digit
+                                              first).
+        """
+
+        # Models deployed before the candidates were added only return the
+        # predicted digit
+        candidates = prediction.get(
+            'Candidates',
+            [[prediction['Digit'], prediction['Confidence']]]
+        )
+
+        return (
+            prediction['Digit'],
+            prediction['Confidence'],
+            [tuple(candidate) for candidate in candidates]
+        )
 
 
     def __get_decimal_confidence(self, segment_shape):
@@ -566,40 +1029,40 @@ class DigitGetter:
         return confidence * 100.0
 
 
-    def __send_to_model(self, model_name, img):
+    def __send_to_model(self, model_name, batch):
         """
-        Sends an image to a machine learning model to be processed.
+        Sends a batch of images to a machine learning model to be processed.
 
         Parameters:
             model_name (str): The name of the target model.
-            img (numpy.ndarray): The image to send to the model.
+            batch (numpy.ndarray): The (N, 28, 28) images to send to the model
+                                   (see __normalize_digits).
 
         Returns:
-            dict: The model's results.
+            list(dict): The model's results (one per image).
 
         Raises:
             OkraModelError: Failed to run a model.
         """
 
-        payload = {"data": img.tobytes(), "x": img.shape[1], "y": img.shape[0]}
-
         if self.__debug:
 
             if model_name == 'OkraClassifier':
 
-                response = self.__classifier_handle.handle(payload)
+                # The in-process handlers take the array without encoding it
+                body = self.__classifier_handle.predict(batch)
 
             else:
                 raise OkraModelError(f'Unkown model: "{model_name}"')
 
-            body = json.loads(response[0])
-
         else:
 
             try:
-                response = requests.post(
-                    f'http://localhost:6060/predictions/{model_name}',
-                    data=payload
+                response = self.__get_session().post(
+                    f'{self.ts_url.rstrip("/")}/predictions/{model_name}',
+                    data=payload.encode(batch),
+                    headers={'Content-Type': payload.CONTENT_TYPE},
+                    timeout=self.ts_timeout
                 )
                 body = response.json()
 
@@ -611,9 +1074,103 @@ class DigitGetter:
             except requests.exceptions.ConnectionError as e:
                 raise OkraModelError(f'Unable to connect to TorchServe: {e}')
 
+            except requests.exceptions.Timeout as e:
+                raise OkraModelError(f'TorchServe request timed out: {e}')
+
+            except requests.exceptions.RetryError as e:
+                raise OkraModelError(f'TorchServe is unavailable: {e}')
+
         return body
 
 
+    def __submit_to_model(self, model_name, imgs):
+        """
+        Sends a batch of images to a model on TorchServe without waiting for
+        the results (see ts_async).
+
+        Parameters:
+            model_name (str): The name of the target model.
+            imgs (list(numpy.ndarray)): The (unpadded) digit images to send
+                                        to the model.
+
+        Returns:
+            concurrent.futures.Future: Resolves to the model's results (one
+                                       per image).
+
+        Raises:
+            OkraModelError: The asynchronous client is not available.
+        """
+
+        if self.__async_client is None:
+
+            from .asyncclient import AsyncTorchServeClient
+
+            self.__async_client = AsyncTorchServeClient(
+                self.ts_url,
+                max_in_flight=self.ts_pool_size,
+                timeout=self.ts_timeout,
+                retries=self.ts_retries
+            )
+
+        return self.__async_client.submit(model_name, self.__normalize_digits(imgs))
+
+
+    def __normalize_digits(self, imgs, padding=True):
+        """
+        Converts digit images into the classifier's input. Each image is
+        padded to a square and area-resized straight into one preallocated
+        buffer, so there are no intermediate arrays to stack.
+
+        Parameters:
+            imgs (list(numpy.ndarray)): Images that each contain a single
+                                        digit.
+            padding (bool): Pad each image (see __apply_padding) before it is
+                            resized (default=True).
+
+        Returns:
+            numpy.ndarray: A uint8 array with shape (N, 28, 28).
+        """
+
+        batch = np.empty((len(imgs), 28, 28), dtype=np.uint8)
+
+        for i, img in enumerate(imgs):
+
+            if padding:
+                img = self.__apply_padding(img)
+
+            cv2.resize(img, (28, 28), dst=batch[i], interpolation=cv2.INTER_AREA)
+
+        return batch
+
+
+    def __get_session(self):
+        """
+        Returns the HTTP session used for TorchServe requests. The session is
+        created on first use and keeps its connections alive between requests.
+        """
+
+        if self.__session is None:
+
+            retries = Retry(
+                total=self.ts_retries,
+                backoff_factor=0.1,
+                status_forcelist=[502, 503, 504],
+                allowed_methods=['POST']
+            )
+
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=self.ts_pool_size,
+                max_retries=retries
+            )
+
+            self.__session = requests.Session()
+            self.__session.mount('http://', adapter)
+            self.__session.mount('https://', adapter)
+
+        return self.__session
+
+
     def __show_debug_image(self, img, title):
         """Helper function to display a matplotlib plot of an image"""
 
@@ -649,7 +1206,7 @@ class OkraTracer:
         self.__num_directions = len(self.__directions)
 
 
-    def trace(self, img, bounds, pixel, scan_state):
+    def trace(self, img, bounds, pixel, scan_state, check_line_issue=True):
         """
         An edge tracing algorithm that finds the smallest box that fits a
         piece of handwriting.
@@ -661,6 +1218,8 @@ class OkraTracer:
             pixel (int, int): The coordinate of the starting pixel.
             scan_state (dict): A dictionary object to save the state of the
                                scan between function calls.
+            check_line_issue (bool): Check for the digit-touching-line issue
+                                     (default=True).
         """
 
         # The traversable area within the image
@@ -692,11 +1251,15 @@ class OkraTracer:
                     if self.__is_white(next_pixel, img):
 
                         self.__update_bounds(bounds, next_pixel)
-                        self.__update_layers(
-                            layers,
-                            next_direction,
-                            next_pixel
-                        )
+
+                        # The layers are only used to find lines
+                        if check_line_issue:
+                            self.__update_layers(
+                                layers,
+                                next_direction,
+                                next_pixel
+                            )
+
                         start_direction = self.__get_start_direction(
                             next_direction
                         )
@@ -708,7 +1271,8 @@ class OkraTracer:
                 break
 
         # Before returning, check for the digit-touching-line issue.
-        self.__check_for_line_issue(bounds, layers, img.shape)
+        if check_line_issue:
+            self.__check_for_line_issue(bounds, layers, img.shape)
 
 
     def __move(self, direction, current_pixel):
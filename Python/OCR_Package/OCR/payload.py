@@ -0,0 +1,126 @@
+#
+# A compact binary format for sending image tensors to the classifier
+#
+# Layout (little-endian):
+#
+#     magic   (4 bytes)  b'OKRA'
+#     version (uint8)    The format version (currently 1)
+#     dtype   (uint8)    The element type (see DTYPE_CODES)
+#     ndim    (uint8)    The number of dimensions
+#     shape   (uint32 x ndim)
+#     data    (the raw C-ordered array data)
+#
+# Digits are sent as a (N, 28, 28) uint8 array, so any number of digits can
+# be sent in a single message.
+#
+
+import json
+import struct
+import numpy as np
+
+
+MAGIC = b'OKRA'
+VERSION = 1
+
+HEADER = struct.Struct('<4sBBB')
+DIMENSION = struct.Struct('<I')
+
+DTYPE_CODES = {
+    np.dtype(np.uint8): 1,
+    np.dtype(np.float32): 2
+}
+
+CODE_DTYPES = {code: dtype for dtype, code in DTYPE_CODES.items()}
+
+CONTENT_TYPE = 'application/octet-stream'
+
+
+def encode(array):
+    """
+    Packs an array into the binary payload format.
+
+    Parameters:
+        array (numpy.ndarray): The array to pack (uint8 or float32).
+
+    Returns:
+        bytes: The packed array.
+
+    Raises:
+        ValueError: The array's dtype is not supported.
+    """
+
+    if array.dtype not in DTYPE_CODES:
+        raise ValueError(f'Unsupported payload dtype: {array.dtype}')
+
+    header = HEADER.pack(MAGIC, VERSION, DTYPE_CODES[array.dtype], array.ndim)
+    shape = b''.join(DIMENSION.pack(dim) for dim in array.shape)
+
+    return header + shape + np.ascontiguousarray(array).tobytes()
+
+
+def decode(buffer):
+    """
+    Unpacks an array from the binary payload format.
+
+    Parameters:
+        buffer (bytes): The packed array.
+
+    Returns:
+        numpy.ndarray: The array. It shares memory with the buffer, so it
+                       will be read-only if the buffer is.
+
+    Raises:
+        ValueError: The buffer is not a valid payload.
+    """
+
+    if len(buffer) < HEADER.size:
+        raise ValueError('Payload is too short')
+
+    magic, version, dtype_code, ndim = HEADER.unpack_from(buffer)
+
+    if magic != MAGIC:
+        raise ValueError('Payload has an invalid header')
+
+    if version != VERSION:
+        raise ValueError(f'Unsupported payload version: {version}')
+
+    if dtype_code not in CODE_DTYPES:
+        raise ValueError(f'Unsupported payload dtype code: {dtype_code}')
+
+    offset = HEADER.size
+    shape = []
+
+    if len(buffer) < offset + ndim * DIMENSION.size:
+        raise ValueError('Payload is too short for its shape')
+
+    for _ in range(ndim):
+        shape.append(DIMENSION.unpack_from(buffer, offset)[0])
+        offset += DIMENSION.size
+
+    dtype = CODE_DTYPES[dtype_code]
+    count = int(np.prod(shape))
+
+    if len(buffer) - offset != count * dtype.itemsize:
+        raise ValueError('Payload size does not match its shape')
+
+    return np.frombuffer(buffer, dtype, count, offset).reshape(shape)
+
+
+def error_response(context, idx, message):
+    """
+    Makes the response to a request that could not be processed. When the
+    handler runs in TorchServe, the request's status code is set to 400.
+
+    Parameters:
+        context: The TorchServe context (None outside of TorchServe).
+        idx (int): The index of the request in the batch.
+        message (str): What was wrong with the request.
+
+    Returns:
+        str: The JSON body of the response.
+    """
+
+    if context is not None and hasattr(context, 'set_response_status'):
+        context.set_response_status(400, message, idx=idx)
+
+    return json.dumps({'code': 400, 'type': 'BadRequest', 'message': message}) + '\n'
@@ -2,6 +2,8 @@
 # Validation functions for OCR output
 #
 
+import heapq
+import math
 import random
 
 
@@ -15,6 +17,9 @@ SMALL_PENALTY   = 1.0
 DEFAULT_PENALTY = 2.5
 LARGE_PENALTY   = 5.0
 
+# The max number of candidate combinations checked by __search_candidates
+SEARCH_LIMIT = 64
+
 
 commonly_confused_digits = [
     [8],           # 0
@@ -36,7 +41,10 @@ def validate_score(raw, max_score=None, min_score=0):
     Validates and auto-corrects a score field.
 
     Parameters:
-        raw (list, list): The raw output of the OCR.
+        raw (list, list): The raw output of the OCR. If it also has the
+                          candidates for each value (see
+                          okra.DigitGetter.digit_candidates), they are
+                          searched before any digit is guessed.
         max_score (int): The upper-bound of the score (Defaults to None).
         min_score (int, optional): The lower-bound of the score
                                    (Defaults to 0).
@@ -46,7 +54,7 @@ def validate_score(raw, max_score=None, min_score=0):
         float: The overall confidence percentage.
     """
 
-    nums, confs = raw
+    nums, confs = __unpack(raw)
 
     penalty = __remove_decimal_points(nums, confs, remove_all=False)
 
@@ -61,10 +69,18 @@ def validate_score(raw, max_score=None, min_score=0):
 
             if not a_valid_score(nums, max_score, min_score):
 
-                penalty += __force_valid_score(
-                    nums, confs, max_score, min_score
+                search_penalty = __search_candidates(
+                    nums, confs, lambda c: a_valid_score(c, max_score, min_score)
                 )
 
+                if search_penalty is not None:
+                    penalty += search_penalty
+
+                else:
+                    penalty += __force_valid_score(
+                        nums, confs, max_score, min_score
+                    )
+
     penalty += __trim_leading_zeros(nums, confs)
 
     return __stringify(nums), __overall_confidence(confs, penalty)
@@ -82,7 +98,7 @@ def validate_rider_number(raw):
         float: The overall confidence percentage.
     """
 
-    nums, confs = raw
+    nums, confs = __unpack(raw)
 
     penalty = 0.0
 
@@ -109,7 +125,7 @@ def validate_time(raw):
         float: The overall confidence percentage.
     """
 
-    nums, confs = raw
+    nums, confs = __unpack(raw)
 
     penalty = __remove_decimal_points(nums, confs, remove_all=True)
 
@@ -119,7 +135,13 @@ def validate_time(raw):
 
         if not a_valid_time(nums):
 
-            penalty += __force_valid_time(nums, confs)
+            search_penalty = __search_candidates(nums, confs, a_valid_time)
+
+            if search_penalty is not None:
+                penalty += search_penalty
+
+            else:
+                penalty += __force_valid_time(nums, confs)
 
 
     return __stringify(nums), __overall_confidence(confs, penalty)
@@ -137,7 +159,7 @@ def validate_weight(raw):
         float: The overall confidence percentage.
     """
 
-    nums, confs = raw
+    nums, confs = __unpack(raw)
 
     penalty = __remove_decimal_points(nums, confs, remove_all=True)
 
@@ -147,7 +169,13 @@ def validate_weight(raw):
 
         if not a_valid_weight(nums):
 
-            penalty += __force_valid_weight(nums, confs)
+            search_penalty = __search_candidates(nums, confs, a_valid_weight)
+
+            if search_penalty is not None:
+                penalty += search_penalty
+
+            else:
+                penalty += __force_valid_weight(nums, confs)
 
     penalty += __trim_leading_zeros(nums, confs)
 
@@ -459,6 +487,87 @@ def __insert_L(nums, confs):
 
 
 
+def __search_candidates(nums, confs, is_valid):
+    """
+    Looks for the most probable valid value among the classifier's candidates
+    for each digit (see DigitConfidence). The combinations of candidates are
+    checked from the most to the least probable, and the search gives up
+    after SEARCH_LIMIT of them.
+
+    Returns:
+        float: The penalty for the replaced digits, or None if no valid value
+               was found (nums is not changed).
+    """
+
+    # The options for each value, from the most to the least probable.
+    # Decimal points and inserted values can't be replaced. The earlier
+    # corrections may have changed a value, so the current one is not always
+    # the most probable.
+    options = []
+
+    for num, conf in zip(nums, confs):
+
+        candidates = getattr(conf, 'candidates', None)
+
+        if candidates is None:
+            options.append([(num, conf)])
+
+        else:
+            options.append(sorted(
+                [(num, conf)] + [c for c in candidates if c[0] != num],
+                key=lambda option: -option[1]
+            ))
+
+    # The negative log probability of each option
+    costs = [
+        [-math.log(max(conf, 1e-6) / 100.0) for _, conf in value_options]
+        for value_options in options
+    ]
+
+    start = (0,) * len(options)
+    queue = [(sum(value_costs[0] for value_costs in costs), start)]
+    queued = {start}
+
+    for _ in range(SEARCH_LIMIT):
+
+        if not queue:
+            break
+
+        choice_cost, choice = heapq.heappop(queue)
+
+        values = [options[i][j][0] for i, j in enumerate(choice)]
+
+        if is_valid(values):
+
+            penalty = 0.0
+
+            for i, value in enumerate(values):
+
+                # Only the digits that changed are penalized
+                if value != nums[i]:
+
+                    nums[i], confs[i] = options[i][choice[i]]
+                    penalty += SMALL_PENALTY
+
+            return penalty
+
+        # The next most probable combinations replace one more digit
+        for i in range(len(choice)):
+
+            if choice[i] + 1 < len(options[i]):
+
+                next_choice = choice[:i] + (choice[i] + 1,) + choice[i + 1:]
+
+                if next_choice not in queued:
+
+                    next_cost = choice_cost - costs[i][choice[i]] + costs[i][choice[i] + 1]
+
+                    queued.add(next_choice)
+                    heapq.heappush(queue, (next_cost, next_choice))
+
+    return None
+
+
 def __force_valid_score(nums, confs, max_score, min_score):
 
     penalty = 0.0
@@ -662,6 +771,26 @@ def __overall_confidence(confs, penalty):
     return min(confs) - penalty
 
 
+def __unpack(raw):
+    """
+    Splits the raw output of the OCR into the values and confidences. If it
+    has candidates, they are kept with the confidences, so they follow their
+    values when values are deleted or inserted.
+    """
+
+    if len(raw) == 2:
+        return raw
+
+    nums, confs, candidates = raw
+
+    confs = [
+        conf if digit_candidates is None else DigitConfidence(conf, digit_candidates)
+        for conf, digit_candidates in zip(confs, candidates)
+    ]
+
+    return nums, confs
+
+
 
 #
 # Second level of helper functions
@@ -760,3 +889,17 @@ def __get_replacement_digit(original, high, low):
 
     return digit
 
+
+
+class DigitConfidence(float):
+    """
+    The confidence of a digit, with the classifier's candidates for it as a
+    list of (digit, confidence) tuples.
+    """
+
+    def __new__(cls, confidence, candidates):
+
+        obj = super().__new__(cls, confidence)
+        obj.candidates = candidates
+
+        return obj
@@ -2,67 +2,109 @@ import cv2 as cv
 import numpy as np
 from pathlib import Path
 
+from .exceptions import PreprocessingAlignmentError, PreprocessingImageError
+
 BCFilePath = 'bc/'
 BCFileName = "BCE-TEMPLATE.jpg"
 
 CTRFilePath = 'ctr/'
-CTRFileName = "CTR-TEMPLATE.jpg"
+CTRFileName = "CTR_TEMPLATE.jpg"
+
+# The number of best matches used to compute the homography
+num_matches = 50
+
+# Templates that have already been loaded, keyed by their file path
+__templates = {}
 
 '''
-Function Brief: Aligns an input BCE image to a predefined BCE template image based on feature matching. 
-                It detects keypoints in both images, matches them, and computes a homography matrix 
-                to transform the input image, making it align with the template. The aligned image 
-                is then returned.
+Function Brief: Loads a template image and computes its ORB keypoints and descriptors.
+                Each template is only loaded once. After that, the cached features are
+                returned so only the input image needs feature extraction.
+
+Parameters:
+    template_path (pathlib.Path): The path to the template image.
+
+Returns:
+    template (dict): The template's 'shape', 'keypoints', and 'descriptors'.
+
+Raises:
+    PreprocessingImageError: The template image could not be opened.
+'''
+def get_template(template_path):
+
+    if template_path not in __templates:
+
+        template = cv.imread(str(template_path))
+
+        if template is None:
+            raise PreprocessingImageError(f'Cannot open the template image "{template_path}"')
+
+        template_gray = cv.cvtColor(template, cv.COLOR_BGR2GRAY)
+
+        keypoints, descriptors = cv.ORB_create().detectAndCompute(template_gray, None)
+
+        __templates[template_path] = {
+            'shape': template_gray.shape,
+            'keypoints': keypoints,
+            'descriptors': descriptors
+        }
+
+    return __templates[template_path]
+
+'''
+Function Brief: Computes the homography that maps an input image onto a template by matching
+                the ORB features of the input image with the cached template features.
 
 Parameters:
     image (numpy.ndarray): The source image to be aligned to the template.
+    template (dict): The template features returned by get_template().
 
 Returns:
-    aligned_image (numpy.ndarray): The aligned version of the input image, transformed to match the layout of the template image.
+    M (numpy.ndarray): The 3x3 homography matrix.
+
+Raises:
+    PreprocessingAlignmentError: Not enough features could be matched.
 '''
-def BCAlignImage(image):
-    # Load the image
-    template = cv.imread(Path(__file__).parent / BCFilePath / BCFileName)
+def __find_homography(image, template):
 
-    # Detect ORB features and compute descriptors.
-    orb = cv.ORB_create()
+    if image.ndim == 3:
+        image_gray = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
+    else:
+        image_gray = image
 
-    template_gray = cv.cvtColor(template, cv.COLOR_BGR2GRAY)
-    image_gray = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
+    # Find keypoints and descriptors with ORB for the input image
+    keypoints, descriptors = cv.ORB_create().detectAndCompute(image_gray, None)
 
-    # Find keypoints and descriptors with ORB for both images
-    keypoints1, descriptors1 = orb.detectAndCompute(template_gray, None)
-    keypoints2, descriptors2 = orb.detectAndCompute(image_gray, None)
+    if descriptors is None or template['descriptors'] is None:
+        raise PreprocessingAlignmentError('No features were found to align the image')
 
     # Match descriptors using BFMatcher
     bf = cv.BFMatcher(cv.NORM_HAMMING, crossCheck=True)
-    matches = bf.match(descriptors1, descriptors2)
+    matches = bf.match(template['descriptors'], descriptors)
     matches = sorted(matches, key=lambda x: x.distance)
 
     # Select only the top matches
-    num_matches = 50
     matches = matches[:num_matches]
 
-    # Draw matches for visualization (optional)
-    matched_image = cv.drawMatches(template, keypoints1, image, keypoints2, matches, None, flags=cv.DrawMatchesFlags_NOT_DRAW_SINGLE_POINTS)
+    if len(matches) < 4:
+        raise PreprocessingAlignmentError('Not enough features were matched to align the image')
 
     # Get matched keypoints for homography
-    src_pts = np.float32([keypoints1[m.queryIdx].pt for m in matches]).reshape(-1, 1, 2)
-    dst_pts = np.float32([keypoints2[m.trainIdx].pt for m in matches]).reshape(-1, 1, 2)
+    src_pts = np.float32([template['keypoints'][m.queryIdx].pt for m in matches]).reshape(-1, 1, 2)
+    dst_pts = np.float32([keypoints[m.trainIdx].pt for m in matches]).reshape(-1, 1, 2)
 
     # Compute Homography matrix
     M, mask = cv.findHomography(dst_pts, src_pts, cv.RANSAC, 5.0)
 
-    # Warp output_image to align with template_image
-    h, w = template.shape[:2]
-    aligned_image = cv.warpPerspective(image, M, (w, h))
+    if M is None:
+        raise PreprocessingAlignmentError('A homography could not be computed to align the image')
 
-    return aligned_image
+    return M
 
 '''
-Function Brief: Aligns an input CTR image to a predefined CTR template image based on feature matching. 
-                It detects keypoints in both images, matches them, and computes a homography matrix 
-                to transform the input image, making it align with the template. The aligned image 
+Function Brief: Aligns an input BCE image to a predefined BCE template image based on feature matching.
+                It detects keypoints in both images, matches them, and computes a homography matrix
+                to transform the input image, making it align with the template. The aligned image
                 is then returned.
 
 Parameters:
@@ -70,39 +112,44 @@ Parameters:
 
 Returns:
     aligned_image (numpy.ndarray): The aligned version of the input image, transformed to match the layout of the template image.
+
+Raises:
+    PreprocessingImageError: The template image could not be opened.
+    PreprocessingAlignmentError: The image could not be matched with the template.
 '''
-def CTRAlignImage(image):
-    # Load the image
-    template = cv.imread(Path(__file__).parent / CTRFilePath / CTRFileName)
+def BCAlignImage(image):
 
-    # Detect ORB features and compute descriptors.
-    orb = cv.ORB_create()
+    template = get_template(Path(__file__).parent / BCFilePath / BCFileName)
 
-    template_gray = cv.cvtColor(template, cv.COLOR_BGR2GRAY)
-    image_gray = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
+    M = __find_homography(image, template)
 
-    # Find keypoints and descriptors with ORB for both images
-    keypoints1, descriptors1 = orb.detectAndCompute(template_gray, None)
-    keypoints2, descriptors2 = orb.detectAndCompute(image_gray, None)
+    # Warp output_image to align with template_image
+    h, w = template['shape']
+    aligned_image = cv.warpPerspective(image, M, (w, h))
 
-    # Match descriptors using BFMatcher
-    bf = cv.BFMatcher(cv.NORM_HAMMING, crossCheck=True)
-    matches = bf.match(descriptors1, descriptors2)
-    matches = sorted(matches, key=lambda x: x.distance)
+    return aligned_image
 
-    # Select only the top matches
-    num_matches = 50
-    matches = matches[:num_matches]
+'''
+Function Brief: Aligns an input CTR image to a predefined CTR template image based on feature matching.
+                It detects keypoints in both images, matches them, and computes a homography matrix
+                to transform the input image, making it align with the template. The aligned image
+                is then returned.
 
-    # Draw matches for visualization (optional)
-    matched_image = cv.drawMatches(template, keypoints1, image, keypoints2, matches, None, flags=cv.DrawMatchesFlags_NOT_DRAW_SINGLE_POINTS)
+Parameters:
+    image (numpy.ndarray): The source image to be aligned to the template.
 
-    # Get matched keypoints for homography
-    src_pts = np.float32([keypoints1[m.queryIdx].pt for m in matches]).reshape(-1, 1, 2)
-    dst_pts = np.float32([keypoints2[m.trainIdx].pt for m in matches]).reshape(-1, 1, 2)
+Returns:
+    aligned_image (numpy.ndarray): The aligned version of the input image, transformed to match the layout of the template image.
 
-    # Compute Homography matrix
-    M, mask = cv.findHomography(dst_pts, src_pts, cv.RANSAC, 5.0)
+Raises:
+    PreprocessingImageError: The template image could not be opened.
+    PreprocessingAlignmentError: The image could not be matched with the template.
+'''
+def CTRAlignImage(image):
+
+    template = get_template(Path(__file__).parent / CTRFilePath / CTRFileName)
+
+    M = __find_homography(image, template)
 
     # Warp output_image to align with template_image
     h, w = image.shape[:2]
@@ -0,0 +1,227 @@
+'''
+Benchmarks the line search of the template corner detection in lime.py
+against the original pixel-by-pixel implementation, and checks that both find
+the same corners.
+
+Run from the Preprocessing_Package directory:
+
+    python -m preprocessing.benchmark_lime
+'''
+
+import timeit
+import cv2 as cv
+import numpy as np
+from pathlib import Path
+
+from . import lime
+from .scoresheet import Paper_Extraction
+from .check_extension import check_extension
+from .exceptions import PreprocessingAlignmentError
+
+
+SAMPLE_FOLDERS = ['bc', 'ctr']
+
+# The number of times each corner search is timed
+REPEAT = 5
+
+
+###############################################################################
+# THE ORIGINAL IMPLEMENTATION, KEPT AS A REFERENCE.
+###############################################################################
+
+def reference_find_corners(processed_image, ctr_mode=False):
+
+    line_points = reference_find_vertical_lines(processed_image, ctr_mode)
+
+    TL = reference_follow_line(processed_image, line_points[0], step=-1)
+    BL = reference_follow_line(processed_image, line_points[0], step= 1)
+    TR = reference_follow_line(processed_image, line_points[3], step=-1)
+    BR = reference_follow_line(processed_image, line_points[3], step= 1)
+
+    return np.float32([TL, TR, BL, BR])
+
+
+def reference_find_vertical_lines(image, ctr_mode=False):
+
+    middle = image.shape[0] * 5 // 9
+
+    percent_margin = 0.03 if ctr_mode else 0.10
+
+    margin = int(image.shape[1] * percent_margin)
+    columns = slice(margin, -margin)
+
+    row = image[middle, columns]
+
+    for next_row_i in range(middle + 1, image.shape[0]):
+
+        row = np.logical_or(row, image[next_row_i, columns])
+        x_points = reference_get_points_from_row_slice(row)
+
+        if len(x_points) == 4:
+            break
+
+        elif len(x_points) < 4:
+            raise PreprocessingAlignmentError('Fewer than 4 points detected')
+
+    if len(x_points) > 4:
+        raise PreprocessingAlignmentError('More than 4 points detected')
+
+    if not ctr_mode:
+        lime.__validate_point_spacing(x_points, tolerance=0.05)
+
+    return np.array([[margin + x, middle] for x in x_points])
+
+
+def reference_get_points_from_row_slice(img_row):
+
+    x_points = []
+    line_flag = False
+
+    for i in range(len(img_row)):
+
+        if line_flag:
+            if img_row[i]:
+                line_flag = False
+
+        else:
+            if not img_row[i]:
+                x_points.append(i)
+                line_flag = True
+
+    return x_points
+
+
+def reference_follow_line(image, start_pixel, step):
+
+    x, y = start_pixel
+
+    while True:
+
+        next_y = y + step
+
+        if next_y < 0 or next_y >= image.shape[0]:
+            return [x, y]
+
+        slant_left = reference_is_line(image, x - 1, next_y)
+        straight = reference_is_line(image, x, next_y)
+        slant_right = reference_is_line(image, x + 1, next_y)
+
+        if not slant_left and not slant_right and not straight:
+            return [x, y]
+
+        if not slant_left and slant_right:
+            x += 1
+
+        if not slant_right and slant_left:
+            x -= 1
+
+        if not straight and slant_right:
+            x += 1
+
+        if not straight and slant_left:
+            x -= 1
+
+        y = next_y
+
+
+def reference_is_line(image, x, y):
+
+    if x < 0 or x >= image.shape[1]:
+        return False
+
+    return image[y, x] == 0
+
+
+###############################################################################
+# BENCHMARK
+###############################################################################
+
+def load_page(path):
+    """
+    Extracts the page from a sample photo the same way the server does.
+    """
+
+    buffer = path.read_bytes()
+    corner_dict = Paper_Extraction(buffer)['corner_points']
+
+    corner_points = np.float32([[pt['x'], pt['y']] for pt in corner_dict])
+
+    width = int(max(
+        np.linalg.norm(corner_points[2] - corner_points[3]),
+        np.linalg.norm(corner_points[1] - corner_points[0])
+    ))
+    height = int(max(
+        np.linalg.norm(corner_points[1] - corner_points[2]),
+        np.linalg.norm(corner_points[0] - corner_points[3])
+    ))
+
+    dst = np.float32([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]])
+
+    M = cv.getPerspectiveTransform(corner_points, dst)
+
+    return cv.warpPerspective(check_extension(buffer), M, (width, height))
+
+
+def vectorized_find_corners(processed_image, ctr_mode=False):
+
+    line_points = lime.__find_vertical_lines(processed_image, ctr_mode)
+
+    TL = lime.__follow_line(processed_image, line_points[0], step=-1)
+    BL = lime.__follow_line(processed_image, line_points[0], step= 1)
+    TR = lime.__follow_line(processed_image, line_points[3], step=-1)
+    BR = lime.__follow_line(processed_image, line_points[3], step= 1)
+
+    return np.float32([TL, TR, BL, BR])
+
+
+def run_corner_search(find_corners, image, ctr_mode):
+
+    try:
+        return find_corners(image, ctr_mode)
+
+    except PreprocessingAlignmentError as e:
+        return str(e)
+
+
+def main():
+
+    total_reference = 0.0
+    total_vectorized = 0.0
+    mismatches = 0
+
+    for folder in SAMPLE_FOLDERS:
+
+        ctr_mode = folder == 'ctr'
+
+        for path in sorted((Path(__file__).parent / folder).glob(f'{folder.upper()}-*.jpg')):
+
+            # The thresholding is the same for both, so only the line search
+            # is timed
+            page = lime.__preprocess(load_page(path))
+
+            reference = run_corner_search(reference_find_corners, page, ctr_mode)
+            vectorized = run_corner_search(vectorized_find_corners, page, ctr_mode)
+
+            if isinstance(reference, str) or isinstance(vectorized, str):
+                same = reference == vectorized
+            else:
+                same = np.array_equal(reference, vectorized)
+
+            if not same:
+                mismatches += 1
+
+            reference_time = min(timeit.repeat(lambda: run_corner_search(reference_find_corners, page, ctr_mode), number=1, repeat=REPEAT))
+            vectorized_time = min(timeit.repeat(lambda: run_corner_search(vectorized_find_corners, page, ctr_mode), number=1, repeat=REPEAT))
+
+            total_reference += reference_time
+            total_vectorized += vectorized_time
+
+            print(f'{path.name:12} {page.shape[1]:5}x{page.shape[0]:<5} reference {reference_time * 1000:8.1f} ms   vectorized {vectorized_time * 1000:8.1f} ms   {"same" if same else "DIFFERENT"}')
+
+    print()
+    print(f'Total: reference {total_reference:.3f} s, vectorized {total_vectorized:.3f} s ({total_reference / total_vectorized:.1f}x faster)')
+    print(f'Mismatched corners: {mismatches}')
+
+
+if __name__ == '__main__':
+    main()
@@ -40,6 +40,88 @@ def check_extension(raw_image):
         NotImplementedError : HEIC or PDF loading not configured.
     """
 
+    image, extension = __open_image(raw_image)
+
+    # PDF files are a special case
+    if extension == 'pdf':
+        return np.array(image, dtype=np.uint8)
+
+    ImageOps.exif_transpose(image, in_place=True)
+    buffer = np.array(image, dtype=np.uint8)
+
+    if buffer.shape[2] == 4:
+        return buffer[:, :, :3]
+
+    else:
+        return buffer
+
+
+def check_extension_reduced(raw_image, max_dimension):
+    """
+    Function Brief: Loads a grayscale copy of an image whose longest side is
+                    max_dimension pixels, along with the size of the full
+                    image. JPEG images are decoded at a reduced size directly
+                    (using DCT scaling), so the full image is never
+                    decompressed. The EXIF orientation is still applied.
+
+    Parameters:
+        raw_image (bytes): A buffer holding the raw byte data of an image.
+        max_dimension (int): The length of the longest side of the result.
+
+    Returns:
+        np.ndarray : The grayscale pixel data at the reduced size.
+        (int, int) : The (width, height) of the full image.
+
+    Raises:
+        PreprocessingExtensionError : Invalid or unknown file type.
+        PreprocessingImageError : Image is corrupted or incompatable.
+        NotImplementedError : HEIC or PDF loading not configured.
+    """
+
+    image, extension = __open_image(raw_image)
+
+    full_size = image.size
+    scale = min(max_dimension / full_size[0], max_dimension / full_size[1])
+
+    # Ask the decoder for the smallest size that is still at least as big as
+    # the result. This only has an effect on JPEG images.
+    image.draft('L', (int(np.ceil(full_size[0] * scale)), int(np.ceil(full_size[1] * scale))))
+
+    if extension != 'pdf':
+
+        transposed = ImageOps.exif_transpose(image)
+
+        # The width and height are swapped when the image is rotated
+        if transposed.size != image.size:
+            full_size = (full_size[1], full_size[0])
+
+        image = transposed
+
+    reduced_size = (round(full_size[0] * scale), round(full_size[1] * scale))
+
+    image = image.convert('L').resize(reduced_size, Image.BILINEAR)
+
+    return np.array(image, dtype=np.uint8), full_size
+
+
+def __open_image(raw_image):
+    """
+    Function Brief: Checks the file extension of an image file and opens it
+                    without decoding the pixel data.
+
+    Parameters:
+        raw_image (bytes): A buffer holding the raw byte data of an image.
+
+    Returns:
+        PIL.Image.Image : The opened image (the first page of a PDF).
+        str : The file extension.
+
+    Raises:
+        PreprocessingExtensionError : Invalid or unknown file type.
+        PreprocessingImageError : Image is corrupted or incompatable.
+        NotImplementedError : HEIC or PDF loading not configured.
+    """
+
     allowed_extensions = {'jpg', 'png', 'bmp', 'tif', 'pdf', 'heic'}
 
     extension = filetype.guess_extension(raw_image)
@@ -67,32 +149,22 @@ def check_extension(raw_image):
             if len(images) > 1:
                 print(f'Warning: Only keeping first page of pdf. Ignoring {len(images) - 1} pages')
 
-            return np.array(images[0], dtype=np.uint8)
+            return images[0], extension
 
         else:
              raise NotImplementedError('PDF loading not configured')
 
-    else:
-
-        try:
-            # Decode the image with Pillow and return a numpy array
-            image = Image.open(BytesIO(raw_image))
-
-        except DecompressionBombError:
-            raise PreprocessingImageError('Cannot open due to Decompression Bomb security concerns')
+    try:
+        # Open the image with Pillow (the pixel data is decoded later)
+        image = Image.open(BytesIO(raw_image))
 
-        except UnidentifiedImageError:
-            raise PreprocessingImageError('Image file is corrupt')
+    except DecompressionBombError:
+        raise PreprocessingImageError('Cannot open due to Decompression Bomb security concerns')
 
-        except:
-            raise PreprocessingImageError('An unknown error occured while opening the image')
+    except UnidentifiedImageError:
+        raise PreprocessingImageError('Image file is corrupt')
 
-        ImageOps.exif_transpose(image, in_place=True)
-        buffer = np.array(image, dtype=np.uint8)
-
-        if buffer.shape[2] == 4:
-            return buffer[:, :, :3]
-
-        else:
-            return buffer
+    except:
+        raise PreprocessingImageError('An unknown error occured while opening the image')
 
+    return image, extension
@@ -0,0 +1,129 @@
+import cv2 as cv
+import numpy as np
+
+
+# The min length of a horizontal line, as a fraction of the field's width.
+# Handwritten strokes are much shorter than the ruling lines, which run
+# across the whole field.
+MIN_LINE_FRACTION = 0.6
+
+# How far (in pixels) a line can drift up or down across the field
+TILT_HEIGHT = 3
+
+# The min height of the gaps (in pixels) that are closed where a line crossed
+# a digit. Thicker lines leave taller gaps (see __repair_kernel).
+REPAIR_HEIGHT = 5
+
+
+def remove_lines_from_binary(binary_images, min_line_fraction=MIN_LINE_FRACTION):
+    """
+    Removes the horizontal ruling lines from a batch of binary field images
+    (white handwriting on a black background), before they are segmented.
+    The lines are found with a morphological opening by a horizontal
+    structuring element. The strokes that crossed a line are joined back
+    together afterwards, so digits that touch a line are segmented on their
+    own.
+
+    Parameters:
+        binary_images (list(numpy.ndarray)): The binary images of the fields
+                                             of a page. They are changed in
+                                             place. Blank fields can be None.
+        min_line_fraction (float): The min length of a line as a fraction of
+                                   the image width.
+
+    Returns:
+        int: The number of images that had a line removed.
+    """
+
+    tilt_kernel = cv.getStructuringElement(cv.MORPH_RECT, (1, TILT_HEIGHT))
+
+    # Images with the same width share a structuring element
+    line_kernels = {}
+    cleaned_count = 0
+
+    for img in binary_images:
+
+        if img is None:
+            continue
+
+        width = img.shape[1]
+
+        if width not in line_kernels:
+            line_length = max(int(width * min_line_fraction), 1)
+            line_kernels[width] = cv.getStructuringElement(cv.MORPH_RECT, (line_length, 1))
+
+        # Thicken the strokes first, so a slightly tilted line is still one
+        # long horizontal run. Only the runs that are long enough survive the
+        # opening.
+        lines = cv.morphologyEx(
+            cv.dilate(img, tilt_kernel), cv.MORPH_OPEN, line_kernels[width]
+        )
+        cv.bitwise_and(lines, img, dst=lines)
+
+        if not lines.any():
+            continue
+
+        cv.subtract(img, lines, dst=img)
+
+        # Close the gaps the line left in the strokes that crossed it, but only
+        # around the line so nothing else is joined
+        repair_kernel = __repair_kernel(lines)
+        repaired = cv.morphologyEx(img, cv.MORPH_CLOSE, repair_kernel)
+        line_area = cv.dilate(lines, repair_kernel) > 0
+
+        img[line_area] = repaired[line_area]
+
+        cleaned_count += 1
+
+    return cleaned_count
+
+
+def __repair_kernel(lines):
+    """
+    Returns the structuring element that closes the gaps left by the removed
+    lines. The line mask is as tall as the line plus the tilt where it
+    crossed a stroke, so the gaps are that tall.
+    """
+
+    # Most columns only have the line in them, so the median height of the
+    # removed pixels is the line's thickness
+    column_heights = np.count_nonzero(lines, axis=0)
+    thickness = int(np.median(column_heights[column_heights > 0]))
+
+    height = max(thickness + TILT_HEIGHT, REPAIR_HEIGHT)
+
+    return cv.getStructuringElement(cv.MORPH_RECT, (1, height))
+
+
+def remove_horizontal_lines(image, min_line_fraction=MIN_LINE_FRACTION):
+    """
+    Removes the horizontal ruling lines from a single field image.
+
+    Parameters:
+        image (numpy.ndarray): A color or grayscale image of a field (dark
+                               handwriting on light paper).
+        min_line_fraction (float): The min length of a line as a fraction of
+                                   the image width.
+
+    Returns:
+        numpy.ndarray: A grayscale copy of the image with the lines painted
+                       over with the paper's color.
+    """
+
+    if image.ndim == 3:
+        gray_image = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
+    else:
+        gray_image = image.copy()
+
+    _, binary_image = cv.threshold(gray_image, 0, 255, cv.THRESH_BINARY_INV + cv.THRESH_OTSU)
+
+    # Find the lines in a copy, so the rest of the handwriting is left as-is
+    lines = binary_image.copy()
+    remove_lines_from_binary([lines], min_line_fraction)
+
+    line_pixels = (binary_image > 0) & (lines == 0)
+
+    # The brightest part of the field is the paper
+    gray_image[line_pixels] = np.percentile(gray_image, 90)
+
+    return gray_image
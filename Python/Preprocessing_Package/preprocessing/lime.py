@@ -5,6 +5,12 @@ from . import template
 from .exceptions import PreprocessingAlignmentError
 
 
+# The number of rows that are checked at once when searching for the vertical
+# lines and when following a line to its end
+line_search_chunk_size = 32
+line_follow_chunk_size = 128
+
+
 def BCAlignImage(image):
     """
     Aligns an extracted BC page with the template page.
@@ -16,89 +22,128 @@ def BCAlignImage(image):
         numpy.ndarray: The aligned image.
     """
 
-    try:
+    M = BCAlignTransform(image)
 
-        # Locate the template corners
-        scanned_corners = __find_corners(image)
+    if M is None:
+        # If we can't find the corners, return the original image
+        return image
 
-    except PreprocessingAlignmentError as e:
+    # Apply a perspective transformation to align the image
+    return cv.warpPerspective(image, M, (image.shape[1], image.shape[0]))
 
-        print('Warning: preprocessing.lime failed to align the image;', e)
 
+def CTRAlignImage(image):
+    """
+    Aligns an extracted CTR page with the template page.
+
+    Parameters:
+        image (numpy.ndarray): The image to align.
+
+    Returns:
+        numpy.ndarray: The aligned image.
+    """
+
+    M = CTRAlignTransform(image)
+
+    if M is None:
         # If we can't find the corners, return the original image
         return image
 
-    # Compute the scale between this image and the template image
-    x_scale = image.shape[1] / template.BC_WIDTH
-    y_scale = image.shape[0] / template.BC_HEIGHT
+    # Apply a perspective transformation to align the image
+    return cv.warpPerspective(image, M, (image.shape[1], image.shape[0]))
 
-    # Calculate the the locations of the template corners at the scale of this
-    # image
-    template_corners = np.float32([
-        [486  * x_scale, 263  * y_scale],
-        [1716 * x_scale, 263  * y_scale],
-        [486  * x_scale, 1587 * y_scale],
-        [1716 * x_scale, 1587 * y_scale]
-    ])
 
-    # __demo_image(
-    #     image,
-    #     [scanned_corners, template_corners],
-    #     ['r', 'g'],
-    #     'Before'
-    # )
+def BCAlignTransform(image):
+    """
+    Finds the perspective transformation that aligns an extracted BC page with
+    the template page, without applying it.
 
-    # Apply a perspective transformation to align the image
-    M = cv.getPerspectiveTransform(scanned_corners, template_corners)
-    image = cv.warpPerspective(image, M, (image.shape[1], image.shape[0]))
+    Parameters:
+        image (numpy.ndarray): The image to align (color or grayscale).
 
-    # __demo_image(
-    #     image,
-    #     [scanned_corners, template_corners],
-    #     ['r', 'g'],
-    #     'After'
-    # )
-    # cv.waitKey(0)
-    # cv.destroyAllWindows()
+    Returns:
+        numpy.ndarray: The 3x3 transformation matrix, or None if the image
+                       could not be aligned.
+    """
 
-    return image
+    # The locations of the template corners in the template image
+    template_corners = [
+        [486,  263],
+        [1716, 263],
+        [486,  1587],
+        [1716, 1587]
+    ]
+
+    return __align_transform(
+        image,
+        template_corners,
+        (template.BC_WIDTH, template.BC_HEIGHT)
+    )
 
 
-def CTRAlignImage(image):
+def CTRAlignTransform(image):
     """
-    Aligns an extracted CTR page with the template page.
+    Finds the perspective transformation that aligns an extracted CTR page
+    with the template page, without applying it.
 
     Parameters:
-        image (numpy.ndarray): The image to align.
+        image (numpy.ndarray): The image to align (color or grayscale).
 
     Returns:
-        numpy.ndarray: The aligned image.
+        numpy.ndarray: The 3x3 transformation matrix, or None if the image
+                       could not be aligned.
+    """
+
+    # The locations of the template corners in the template image
+    template_corners = [
+        [118,  615],
+        [1580, 614],
+        [118,  2080],
+        [1581, 2080]
+    ]
+
+    return __align_transform(
+        image,
+        template_corners,
+        (template.CTR_WIDTH, template.CTR_HEIGHT),
+        ctr_mode=True
+    )
+
+
+def __align_transform(image, template_corners, template_size, ctr_mode=False):
+    """
+    Finds the perspective transformation that moves the template corners of a
+    page to where they are in the template.
+
+    Parameters:
+        image (numpy.ndarray): The image of the page.
+        template_corners (list): The (x, y) coordinates of the template corners
+                                 in the template image.
+        template_size ((int, int)): The width and height of the template image.
+        ctr_mode (bool): Enables special behaviours specific to the CTR page.
+
+    Returns:
+        numpy.ndarray: The 3x3 transformation matrix, or None if the corners
+                       could not be found.
     """
 
     try:
 
         # Locate the template corners
-        scanned_corners = __find_corners(image, ctr_mode=True)
+        scanned_corners = __find_corners(image, ctr_mode)
 
     except PreprocessingAlignmentError as e:
 
         print('Warning: preprocessing.lime failed to align the image;', e)
-
-        # If we can't find the corners, return the original image
-        return image
+        return None
 
     # Compute the scale between this image and the template image
-    x_scale = image.shape[1] / template.CTR_WIDTH
-    y_scale = image.shape[0] / template.CTR_HEIGHT
+    x_scale = image.shape[1] / template_size[0]
+    y_scale = image.shape[0] / template_size[1]
 
     # Calculate the the locations of the template corners at the scale of this
     # image
-    template_corners = np.float32([
-        [118  * x_scale, 615  * y_scale],
-        [1580 * x_scale, 614  * y_scale],
-        [118  * x_scale, 2080 * y_scale],
-        [1581 * x_scale, 2080 * y_scale]
-    ])
+    template_corners = np.float32(np.array(template_corners) * [x_scale, y_scale])
 
     # __demo_image(
     #     image,
@@ -106,21 +151,10 @@ def CTRAlignImage(image):
     #     ['r', 'g'],
     #     'Before'
     # )
-
-    # Apply a perspective transformation to align the image
-    M = cv.getPerspectiveTransform(scanned_corners, template_corners)
-    image = cv.warpPerspective(image, M, (image.shape[1], image.shape[0]))
-
-    # __demo_image(
-    #     image,
-    #     [scanned_corners, template_corners],
-    #     ['r', 'g'],
-    #     'After'
-    # )
     # cv.waitKey(0)
     # cv.destroyAllWindows()
 
-    return image
+    return cv.getPerspectiveTransform(scanned_corners, template_corners)
 
 
 def __find_corners(image, ctr_mode=False):
@@ -164,7 +198,7 @@ def __preprocess(image):
     detection.
 
     Parameters:
-        image (numpy.ndarray): The color input image.
+        image (numpy.ndarray): The color or grayscale input image.
 
     Returns:
         numpy.ndarray: A black and white, thresholded version of the input
@@ -172,7 +206,10 @@ def __preprocess(image):
     """
 
     # Create grayscale version of the image
-    gray_image = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
+    if image.ndim == 3:
+        gray_image = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
+    else:
+        gray_image = image
 
     # Apply a threshold. It's not important if handwriting and text quality is
     # reduced. Just as long as the four vertical line are clearly visible.
@@ -228,19 +265,36 @@ def __find_vertical_lines(image, ctr_mode=False):
     columns = slice(margin, -margin)
 
     # The starting row
-    row = image[middle, columns]
+    row = image[middle, columns] != 0
+
+    # Rows are added one at a time (by OR-ing them with the rows above) until
+    # only four lines pass through the accumulated row. The rows are processed
+    # in chunks so the number of lines in every accumulated row can be counted
+    # at once.
+    for chunk_start in range(middle + 1, image.shape[0], line_search_chunk_size):
 
-    for next_row_i in range(middle + 1, image.shape[0]):
+        chunk = image[chunk_start:chunk_start + line_search_chunk_size, columns] != 0
+        chunk[0] |= row
+        rows = np.logical_or.accumulate(chunk, axis=0)
 
-        row = np.logical_or(row, image[next_row_i, columns])
-        x_points = __get_points_from_row_slice(row)
+        # A line starts at every line pixel that follows a background pixel
+        line_pixels = np.logical_not(rows)
+        line_starts = line_pixels.copy()
+        line_starts[:, 1:] &= rows[:, :-1]
 
-        if len(x_points) == 4:
-            # Found them!
+        line_counts = np.count_nonzero(line_starts, axis=1)
+        done = np.flatnonzero(line_counts <= 4)
+
+        if len(done) > 0:
+            row = rows[done[0]]
             break
 
-        elif len(x_points) < 4:
-            raise PreprocessingAlignmentError('Fewer than 4 points detected')
+        row = rows[-1]
+
+    x_points = __get_points_from_row_slice(row)
+
+    if len(x_points) < 4:
+        raise PreprocessingAlignmentError('Fewer than 4 points detected')
 
     if len(x_points) > 4:
         raise PreprocessingAlignmentError('More than 4 points detected')
@@ -270,25 +324,14 @@ def __get_points_from_row_slice(img_row):
         list: The x-coordinates of the lines.
     """
 
-    x_points = []
-    line_flag = False
-
-    for i in range(len(img_row)):
-
-        if line_flag:
+    # A value of False indicates a line pixel
+    line_pixels = np.logical_not(img_row)
 
-            # A value of True indicates a background pixel
-            if img_row[i]:
-                line_flag = False
+    # A line starts at every line pixel that follows a background pixel
+    line_starts = line_pixels.copy()
+    line_starts[1:] &= np.logical_not(line_pixels[:-1])
 
-        else:
-
-            # A value of False indicates a line pixel
-            if not img_row[i]:
-                x_points.append(i)
-                line_flag = True
-
-    return x_points
+    return np.flatnonzero(line_starts).tolist()
 
 
 def __validate_point_spacing(x_points, tolerance):
@@ -340,14 +383,34 @@ def __follow_line(image, start_pixel, step):
 
     while True:
 
-        next_y = y + step
+        # The rows ahead of the current pixel, in the order they are visited
+        if step > 0:
+            window = image[y + 1:y + 1 + line_follow_chunk_size]
+        else:
+            window = image[max(y - line_follow_chunk_size, 0):y][::-1]
 
-        if next_y < 0 or next_y >= image.shape[0]:
+        if len(window) == 0:
             return [x, y]
 
-        slant_left = __is_line(image, x - 1, next_y)
-        straight = __is_line(image, x, next_y)
-        slant_right = __is_line(image, x + 1, next_y)
+        left_column = __column_is_line(window, x - 1)
+        straight_column = __column_is_line(window, x)
+        right_column = __column_is_line(window, x + 1)
+
+        # The rows where the line continues without changing the x-coordinate
+        # can all be skipped at once
+        stays = (straight_column & (left_column == right_column)) | (left_column & right_column)
+        moves = np.flatnonzero(np.logical_not(stays))
+
+        if len(moves) == 0:
+            y += step * len(window)
+            continue
+
+        y += step * int(moves[0])
+        next_y = y + step
+
+        slant_left = left_column[moves[0]]
+        straight = straight_column[moves[0]]
+        slant_right = right_column[moves[0]]
 
         if not slant_left and not slant_right and not straight:
             # This is the end of the line
@@ -368,23 +431,23 @@ def __follow_line(image, start_pixel, step):
         y = next_y
 
 
-def __is_line(image, x, y):
+def __column_is_line(image, x):
     """
-    Checks if a pixel in an image is part of a line or not.
+    Checks which pixels in a column of an image are part of a line.
 
     Parameters:
-        image (numpy.ndarray): The thresholded image.
-        x (int): The x-coordinate of the pixel to check.
-        y (int): The y-coordinate of the pixel to check.
+        image (numpy.ndarray): The thresholded image (or a range of its rows).
+        x (int): The x-coordinate of the column to check.
 
     Returns:
-        bool: True if the pixel lies on a line and False otherwise.
+        numpy.ndarray: A boolean array that is True for each row where the
+                       pixel lies on a line.
     """
 
     if x < 0 or x >= image.shape[1]:
-        return False
+        return np.zeros(image.shape[0], bool)
 
-    return image[y, x] == 0
+    return image[:, x] == 0
 
 
 def __demo_image(image, points, colors, name):
@@ -33,6 +33,7 @@ intermediary, but it is cleaned of horizontal lines.
 # from scoresheet import Paper_Extraction # used to extract paper from original.
 # from preprocessing import absolute_scorefields
 from preprocessing import scorefields
+from preprocessing.check_extension import check_extension
 # import horizontal_remover
 from pathlib import Path
 # from check_extension import checkExtension
@@ -61,11 +62,21 @@ full_path = Path(filePath) / fileName
 with open(full_path, 'rb') as image_file:
 
     buffer = image_file.read()
+
+    # Use the corners of the photo as the corners of the page
+    height, width = check_extension(buffer).shape[:2]
+    corner_dict = [
+        {'x': 0, 'y': 0},
+        {'x': width - 1, 'y': 0},
+        {'x': width - 1, 'y': height - 1},
+        {'x': 0, 'y': height - 1}
+    ]
+
     # absolute
     # extracted_fields = absolute_scorefields.BCSegments(buffer)
 
     # aligned and relative
-    extracted_fields = scorefields.BCSegments(buffer)
+    extracted_fields = scorefields.BCSegments(buffer, corner_dict, scorefields.save_artifact)
 
 
 ####################################
@@ -75,7 +86,7 @@ with open(full_path, 'rb') as image_file:
 # with open(Path(filePath) / fileName, 'rb') as image_file:
 
 #     buffer = image_file.read()
-#     extracted_fields = scorefields.CTRSegments(buffer)
+#     extracted_fields = scorefields.CTRSegments(buffer, corner_dict, scorefields.save_artifact)
 
 
 ######################################################################################
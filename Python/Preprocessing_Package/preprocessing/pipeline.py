@@ -0,0 +1,232 @@
+import cv2 as cv
+import numpy as np
+
+from . import template
+from .lime import BCAlignTransform, CTRAlignTransform
+from .scoresheet import Find_Page_Corners
+from .check_extension import check_extension
+
+
+class ScoresheetImage:
+    """
+    An uploaded scoresheet photo. The image is decoded once, and the page (or
+    just the regions of it that are needed) is warped straight from the photo
+    to the template resolution in one step.
+    """
+
+    def __init__(self, raw_image):
+        """
+        Decodes the uploaded image.
+
+        Parameters:
+            raw_image (bytes): The raw image data.
+
+        Raises:
+            PreprocessingExtensionError: Invalid or unknown file type.
+            PreprocessingImageError: Image is corrupted or incompatable.
+        """
+
+        self.image = check_extension(raw_image)
+        self.__gray_image = None
+
+
+    def find_corners(self):
+        """
+        Locates the corners of the page in the photo.
+
+        Returns:
+            dict: The "corner_points" of the page.
+        """
+
+        return Find_Page_Corners(self.image)
+
+
+    def align_bc(self, corner_dict):
+        """
+        Extracts a BC page from the photo and aligns it with the template.
+
+        Parameters:
+            corner_dict (list): The coordinates of the page corners.
+
+        Returns:
+            numpy.ndarray: The aligned page at template resolution.
+        """
+
+        return self.warp_page(
+            self.bc_transform(corner_dict),
+            (template.BC_WIDTH, template.BC_HEIGHT)
+        )
+
+
+    def align_ctr(self, corner_dict):
+        """
+        Extracts a CTR page from the photo and aligns it with the template.
+
+        Parameters:
+            corner_dict (list): The coordinates of the page corners.
+
+        Returns:
+            numpy.ndarray: The aligned page at template resolution.
+        """
+
+        return self.warp_page(
+            self.ctr_transform(corner_dict),
+            (template.CTR_WIDTH, template.CTR_HEIGHT)
+        )
+
+
+    def bc_transform(self, corner_dict):
+        """
+        Finds the transformation from the photo to an aligned BC page.
+
+        Parameters:
+            corner_dict (list): The coordinates of the page corners.
+
+        Returns:
+            numpy.ndarray: The 3x3 transformation matrix.
+        """
+
+        return self.__find_transform(
+            corner_dict,
+            (template.BC_WIDTH, template.BC_HEIGHT),
+            BCAlignTransform
+        )
+
+
+    def ctr_transform(self, corner_dict):
+        """
+        Finds the transformation from the photo to an aligned CTR page.
+
+        Parameters:
+            corner_dict (list): The coordinates of the page corners.
+
+        Returns:
+            numpy.ndarray: The 3x3 transformation matrix.
+        """
+
+        return self.__find_transform(
+            corner_dict,
+            (template.CTR_WIDTH, template.CTR_HEIGHT),
+            CTRAlignTransform
+        )
+
+
+    def warp_page(self, transform, template_size):
+        """
+        Warps the whole photo to the aligned page.
+
+        Parameters:
+            transform (numpy.ndarray): The transformation from the photo to
+                                       the aligned page.
+            template_size ((int, int)): The width and height of the template.
+
+        Returns:
+            numpy.ndarray: The aligned page at template resolution.
+        """
+
+        return cv.warpPerspective(self.image, transform, template_size)
+
+
+    def warp_region(self, transform, region):
+        """
+        Warps only one rectangle of the aligned page. This gives the same
+        pixels as cropping the rectangle out of warp_page() (give or take one
+        intensity level of rounding), without resampling or allocating the
+        rest of the page.
+
+        Parameters:
+            transform (numpy.ndarray): The transformation from the photo to
+                                       the aligned page.
+            region ((int, int, int, int)): The (x, y, width, height) of the
+                                           rectangle in template coordinates.
+
+        Returns:
+            numpy.ndarray: The rectangle of the aligned page.
+        """
+
+        x, y, w, h = region
+
+        # Move the rectangle's top-left corner to the origin
+        translation = np.array([
+            [1, 0, -x],
+            [0, 1, -y],
+            [0, 0, 1]
+        ], dtype=np.float64)
+
+        return cv.warpPerspective(self.image, translation @ transform, (w, h))
+
+
+    def __find_transform(self, corner_dict, template_size, align_transform):
+        """
+        Composes the page extraction and template alignment transformations
+        into a single transformation from the photo to the aligned page.
+
+        Parameters:
+            corner_dict (list): The coordinates of the page corners.
+            template_size ((int, int)): The width and height of the template.
+            align_transform (function): Finds the template alignment
+                                        transformation of an extracted page.
+
+        Returns:
+            numpy.ndarray: The 3x3 transformation matrix.
+        """
+
+        corner_points = np.array([[pt['x'], pt['y']] for pt in corner_dict], dtype=np.float32)
+
+        # Compute the width and height of the page in the photo
+        width_a = np.linalg.norm(corner_points[2] - corner_points[3])
+        width_b = np.linalg.norm(corner_points[1] - corner_points[0])
+        max_width = max(int(width_a), int(width_b))
+
+        height_a = np.linalg.norm(corner_points[1] - corner_points[2])
+        height_b = np.linalg.norm(corner_points[0] - corner_points[3])
+        max_height = max(int(height_a), int(height_b))
+
+        # Destination points
+        dst = np.array([
+            [0, 0],
+            [max_width - 1, 0],
+            [max_width - 1, max_height - 1],
+            [0, max_height - 1]
+        ], dtype=np.float32)
+
+        # Extracts the page from the photo
+        page_transform = cv.getPerspectiveTransform(corner_points, dst)
+
+        # The template lines are found in a grayscale copy of the page, which
+        # is cheaper to warp than the color image. It keeps the resolution of
+        # the photo, since the line detection is tuned for it.
+        gray_page = cv.warpPerspective(self.__get_gray_image(), page_transform, (max_width, max_height))
+
+        alignment_transform = align_transform(gray_page)
+
+        if alignment_transform is None:
+            transform = page_transform
+        else:
+            transform = alignment_transform @ page_transform
+
+        # Scales the aligned page to the template resolution
+        width, height = template_size
+
+        scale_transform = np.array([
+            [width / max_width, 0, 0],
+            [0, height / max_height, 0],
+            [0, 0, 1]
+        ])
+
+        return scale_transform @ transform
+
+
+    def __get_gray_image(self):
+        """
+        Returns a grayscale version of the photo. It is only created once.
+        """
+
+        if self.__gray_image is None:
+
+            if self.image.ndim == 3:
+                self.__gray_image = cv.cvtColor(self.image, cv.COLOR_BGR2GRAY)
+            else:
+                self.__gray_image = self.image
+
+        return self.__gray_image
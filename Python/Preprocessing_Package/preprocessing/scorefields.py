@@ -1,111 +1,106 @@
 # Imports
 import os
 import cv2 as cv
-import numpy as np
 from . import template
-from . import scoresheet
-from .lime import BCAlignImage, CTRAlignImage
-from .check_extension import check_extension
+from .pipeline import ScoresheetImage
+
 
 """
-Function Brief: Extracts and marks predefined segments (fields) for each rider section on an image.
-                It draws rectangles on each defined field, displaying them and saving each segment in a dictionary.
+Function Brief: Writes a debug artifact to disk, relative to the working directory.
+                Pass this as the artifact_sink of BCSegments or CTRSegments to save
+                the warped page, each cropped field, and the page with the fields marked.
 Parameters:
-    image (str): Path to the source image from which segments need to be extracted.
-
-Returns:
-    extracted_fields (dict): A dictionary containing the score fields from each rider from the BCE scoresheet.
+    name (str): The relative path of the artifact (e.g. "intermediary_fields/Rider1/recovery.jpg").
+    image (numpy.ndarray): The image to save.
 """
-def BCSegments(image, corner_dict):
+def save_artifact(name, image):
 
-    fileOutPath = "output/"
-    output_filename = "output_extraction.jpg"
+    folder = os.path.dirname(name)
 
-    corner_points = np.array([[pt['x'], pt['y']] for pt in corner_dict], dtype=np.float32)
+    if folder and not os.path.exists(folder):
+        os.makedirs(folder)
 
-    # Compute the width and height of the new image
-    width_a = np.linalg.norm(corner_points[2] - corner_points[3])
-    width_b = np.linalg.norm(corner_points[1] - corner_points[0])
-    max_width = max(int(width_a), int(width_b))
+    if not cv.imwrite(name, image):
+        print(f"Error: Could not save output image: {name}")
 
-    height_a = np.linalg.norm(corner_points[1] - corner_points[2])
-    height_b = np.linalg.norm(corner_points[0] - corner_points[3])
-    max_height = max(int(height_a), int(height_b))
 
-    # Destination points
-    dst = np.array([
-        [0, 0],
-        [max_width - 1, 0],
-        [max_width - 1, max_height - 1],
-        [0, max_height - 1]
-    ], dtype="float32")
+"""
+Function Brief: Warps a single field out of a photo, the same way BCSegments and CTRSegments
+                do, without warping the rest of the page. The field can be nudged by an
+                offset (in template pixels), which is limited so the field stays on the page.
+Parameters:
+    page (ScoresheetImage): The decoded photo.
+    transform (numpy.ndarray): The transformation from the photo to the aligned page.
+    region ((int, int, int, int)): The (x, y, width, height) of the field in the template.
+    template_size ((int, int)): The width and height of the template.
+    offset (dict): The "x" and "y" distance to move the field by (optional).
 
-    # Decode image
-    decoded_img = check_extension(image)
+Returns:
+    field_image (numpy.ndarray): The warped field.
+"""
+def warp_field(page, transform, region, template_size, offset=None):
 
-    # Perspective transform
-    M = cv.getPerspectiveTransform(corner_points, dst)
-    warped_img = cv.warpPerspective(decoded_img, M, (max_width, max_height))
+    x, y, w, h = region
 
-    # Save the output image
-    if not cv.imwrite(output_filename, warped_img):
-        print(f"Error: Could not save output image: {fileOutPath + output_filename}")
+    if offset:
+        x = min(max(x + int(offset.get('x', 0)), 0), template_size[0] - w)
+        y = min(max(y + int(offset.get('y', 0)), 0), template_size[1] - h)
 
-    '''Just for the sake of verifing the output
-    -------------------------------------------'''
-    output_folder='intermediary_fields'
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-    '''-------------------------------------------'''
+    return page.warp_region(transform, (x, y, w, h))
 
-    extracted_fields = {}
 
-    # imread() when image is file path
-    # extracted_image = cv.imread(image)
-    # Gives the extracted image that is warped to fit a rectangle.
-    # extracted_image = scoresheet.Paper_Extraction(warped_img)
+"""
+Function Brief: Extracts and marks predefined segments (fields) for each rider section on an image.
+                Each segment is saved in a dictionary.
+Parameters:
+    image (bytes or ScoresheetImage): The source image from which segments need to be extracted.
+    corner_dict (list): The coordinates of the page corners.
+    artifact_sink (function): Called as artifact_sink(name, image) with intermediate images
+                              for debugging (optional). Nothing is written or copied if omitted.
+    roi_only (bool): Only warp the field rectangles instead of the whole page (optional).
+                     The whole page is always warped when an artifact_sink is given.
+    transform (numpy.ndarray): The transformation from the photo to the aligned page, if it was
+                               already found by ScoresheetImage.bc_transform() (optional).
+
+Returns:
+    extracted_fields (dict): A dictionary containing the score fields from each rider from the BCE scoresheet.
+"""
+def BCSegments(image, corner_dict, artifact_sink=None, roi_only=True, transform=None):
+
+    # Decode the image (unless it was already decoded)
+    if not isinstance(image, ScoresheetImage):
+        image = ScoresheetImage(image)
 
-    # Gives aligned image to the template
-    extracted_image = BCAlignImage(warped_img)
+    # The transformation from the photo to the page aligned with the template
+    if transform is None:
+        transform = image.bc_transform(corner_dict)
 
-    horizontal_scalefactor = 1
-    vertical_scalefactor = 1
+    if roi_only and not artifact_sink:
+        # Only the fields will be warped
+        extracted_image = None
 
-    # Check if the result is an integer indicating failure
-    if isinstance(extracted_image, int) and extracted_image == -1:
-        print("Error: Cannot read image file after extraction.")
-        return -1
     else:
-        # Get, Check and Resize(if needed) dimensions of extracted_image
-        height, width = extracted_image.shape[:2]
-        horizontal_scalefactor = width / template.BC_WIDTH
-        vertical_scalefactor = height / template.BC_HEIGHT
+        # Gives the page aligned to the template, at the template resolution
+        extracted_image = image.warp_page(transform, (template.BC_WIDTH, template.BC_HEIGHT))
+
+    if artifact_sink:
+        artifact_sink("output_extraction.jpg", extracted_image)
+
+    extracted_fields = {}
 
-    '''This code is just to verify the output.
-    ------------------------------------------------------------------'''
-    marked_image = extracted_image.copy()
-    '''------------------------------------------------------------------'''
+    # A copy of the page with the fields marked (only made for debugging)
+    marked_image = extracted_image.copy() if artifact_sink else None
 
     for rider, fields in template.BC_TEMPLATE_FIELDS.items():
         extracted_fields[rider] = {}
 
-        '''This code is just to verify the output.
-        ------------------------------------------------------------------'''
-        # Create a subfolder for each rider to organize output
-        rider_folder = os.path.join(output_folder, rider)
-        if not os.path.exists(rider_folder):
-            os.makedirs(rider_folder)
-        '''------------------------------------------------------------------'''
-
         for field_name, (x, y, w, h) in fields.items():
 
-            x = int(np.round(x * horizontal_scalefactor))
-            w = int(np.round(w * horizontal_scalefactor))
-            y = int(np.round(y * vertical_scalefactor))
-            h = int(np.round(h * vertical_scalefactor))
-
             # We are cropping out field from the extracted image here.
-            field_image = extracted_image[y:y + h, x:x + w]
+            if extracted_image is None:
+                field_image = image.warp_region(transform, (x, y, w, h))
+            else:
+                field_image = extracted_image[y:y + h, x:x + w]
 
             # We need to pass the field image to the horizontal remover function here
             # so we can set the key to the cleaned up segment field image.
@@ -118,133 +113,85 @@ def BCSegments(image, corner_dict):
             # to see if the function is working.
             # cv.imwrite("example.jpg", field_image_no_horizontals)
 
-            '''This code is just to verify the output.
-            ------------------------------------------------------------------'''
-            # Save each cropped image to the specified folder
-            field_path = os.path.join(rider_folder, f"{field_name}.jpg")
-
-            # IF YOU CHANGE field_image_no_horizontals to field_image, you can get all the segments of
-            # the original image without the horizontal_remover function edits. I commented it out in case
-            # you want to test it out.
-            # cv.imwrite(field_path, field_image_no_horizontals)
-            cv.imwrite(field_path, field_image)
+            if artifact_sink:
+                # Save each cropped image in a subfolder for each rider
+                artifact_sink(os.path.join("intermediary_fields", rider, f"{field_name}.jpg"), field_image)
 
-            # mark the fields on the image
-            marked_image = cv.rectangle(marked_image, (x, y), (x + w, y + h), (255, 0, 0), 1)
-            '''------------------------------------------------------------------'''
+                # mark the fields on the image
+                marked_image = cv.rectangle(marked_image, (x, y), (x + w, y + h), (255, 0, 0), 1)
 
             # Setting the dictionary key to the segmented image.
             extracted_fields[rider][field_name] = field_image
 
-    if cv.imwrite('outfield.jpg', marked_image):
+    if artifact_sink:
+        artifact_sink('outfield.jpg', marked_image)
         print("Extraction complete.")
 
     return extracted_fields
 
 """
 Function Brief: Extracts and marks predefined segments (fields) for a judge scoresheet.
-                It draws rectangles on each defined field, displaying them and saving each segment in a dictionary.
+                Each segment is saved in a dictionary.
 Parameters:
-    image (str): Path to the source image from which segments need to be extracted.
+    image (bytes or ScoresheetImage): The source image from which segments need to be extracted.
+    corner_dict (list): The coordinates of the page corners.
+    artifact_sink (function): Called as artifact_sink(name, image) with intermediate images
+                              for debugging (optional). Nothing is written or copied if omitted.
+    roi_only (bool): Only warp the field rectangles instead of the whole page (optional).
+                     The whole page is always warped when an artifact_sink is given.
+    transform (numpy.ndarray): The transformation from the photo to the aligned page, if it was
+                               already found by ScoresheetImage.ctr_transform() (optional).
 
 Returns:
     extracted_fields (dict): A dictionary containing the score fields from the judge scoresheet.
 """
-def CTRSegments(image, corner_dict):
-
-    fileOutPath = "output/"
-    output_filename = "output_extraction.jpg"
-
-    corner_points = np.array([[pt['x'], pt['y']] for pt in corner_dict], dtype=np.float32)
-
-    # Compute the width and height of the new image
-    width_a = np.linalg.norm(corner_points[2] - corner_points[3])
-    width_b = np.linalg.norm(corner_points[1] - corner_points[0])
-    max_width = max(int(width_a), int(width_b))
-
-    height_a = np.linalg.norm(corner_points[1] - corner_points[2])
-    height_b = np.linalg.norm(corner_points[0] - corner_points[3])
-    max_height = max(int(height_a), int(height_b))
+def CTRSegments(image, corner_dict, artifact_sink=None, roi_only=True, transform=None):
 
-    # Destination points
-    dst = np.array([
-        [0, 0],
-        [max_width - 1, 0],
-        [max_width - 1, max_height - 1],
-        [0, max_height - 1]
-    ], dtype="float32")
+    # Decode the image (unless it was already decoded)
+    if not isinstance(image, ScoresheetImage):
+        image = ScoresheetImage(image)
 
-    # Decode image
-    decoded_img = check_extension(image)
+    # The transformation from the photo to the page aligned with the template
+    if transform is None:
+        transform = image.ctr_transform(corner_dict)
 
-    # Perspective transform
-    M = cv.getPerspectiveTransform(corner_points, dst)
-    warped_img = cv.warpPerspective(decoded_img, M, (max_width, max_height))
+    if roi_only and not artifact_sink:
+        # Only the fields will be warped
+        extracted_image = None
 
-    # Save the output image
-    if not cv.imwrite(output_filename, warped_img):
-        print(f"Error: Could not save output image: {fileOutPath + output_filename}")
+    else:
+        # Gives the page aligned to the template, at the template resolution
+        extracted_image = image.warp_page(transform, (template.CTR_WIDTH, template.CTR_HEIGHT))
 
-    '''Just for the sake of verifying the output
-    -------------------------------------------'''
-    output_folder='extracted_fields'
-    if not os.path.exists(output_folder):
-        os.makedirs(output_folder)
-    '''-------------------------------------------'''
+    if artifact_sink:
+        artifact_sink("output_extraction.jpg", extracted_image)
 
     extracted_fields = {}
 
-    # imread() when image is file path
-    # extracted_image = cv.imread(image)
-    # extracted_image = scoresheet.Paper_Extraction(image)
-
-    # Gives aligned image to the template
-    extracted_image = CTRAlignImage(warped_img)
-
-
-    horizontal_scalefactor = 1
-    vertical_scalefactor = 1
-
-    # # Check if the result is an integer indicating failure
-    if isinstance(extracted_image, int) and extracted_image == -1:
-        print("Error: Cannot read image file after extraction.")
-        return -1
-    else:
-        # Get, Check and Resize(if needed) dimensions of extracted_image
-        height, width = extracted_image.shape[:2]
-        horizontal_scalefactor = width / template.CTR_WIDTH
-        vertical_scalefactor = height / template.CTR_HEIGHT
-
-    '''Just for the sake of verfiy the output
-    ------------------------------------------------------------------'''
-    marked_image = extracted_image.copy()
-    '''------------------------------------------------------------------'''
+    # A copy of the page with the fields marked (only made for debugging)
+    marked_image = extracted_image.copy() if artifact_sink else None
 
     for field_name, (x, y, w, h) in template.CTR_TEMPLATE_FIELDS.items():
 
-        x = int(np.round(x * horizontal_scalefactor))
-        w = int(np.round(w * horizontal_scalefactor))
-        y = int(np.round(y * vertical_scalefactor))
-        h = int(np.round(h * vertical_scalefactor))
-
         # Extract each field from the image
-        field_image = extracted_image[y:y + h, x:x + w]
+        if extracted_image is None:
+            field_image = image.warp_region(transform, (x, y, w, h))
+        else:
+            field_image = extracted_image[y:y + h, x:x + w]
 
-        '''Just for the sake of verfiy the output
-        ------------------------------------------------------------------'''
-        # Save each cropped image to the specified folder
-        field_path = os.path.join(output_folder, f"{field_name}.jpg")
-        cv.imwrite(field_path, field_image)
-        '''------------------------------------------------------------------'''
+        if artifact_sink:
+            # Save each cropped image to the specified folder
+            artifact_sink(os.path.join("extracted_fields", f"{field_name}.jpg"), field_image)
 
-        # Mark the fields on the copy of the image for verification
-        marked_image = cv.rectangle(marked_image, (x, y), (x + w, y + h), (255, 0, 0), 2)
+            # Mark the fields on the copy of the image for verification
+            marked_image = cv.rectangle(marked_image, (x, y), (x + w, y + h), (255, 0, 0), 2)
 
         # Store the extracted field image in the dictionary
         extracted_fields[field_name] = field_image
 
 
-    if cv.imwrite('outfield.jpg', marked_image):
+    if artifact_sink:
+        artifact_sink('outfield.jpg', marked_image)
         print("Extraction complete. Output saved.")
 
     return extracted_fields
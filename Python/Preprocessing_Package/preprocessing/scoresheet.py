@@ -1,42 +1,74 @@
 # Imports
 import cv2 as cv
 import numpy as np
-from .check_extension import check_extension
+from .check_extension import check_extension_reduced
+
+# Images are reduced to this size for faster processing
+max_dimension = 1000
 
 """
-Function Brief: Extract and warp a score sheet from an input image by detecting
-the largest quadrilateral contour and applying a perspective transformation.
+Function Brief: Locate the corners of a score sheet in an input image by detecting
+the largest quadrilateral contour. The image is decoded at a reduced size, and the
+corners are mapped back to the full size image.
 Parameters:
-    BC_scoresheet (str): The file path of the input image containing the score sheet.
+    image (bytes): The raw data of the input image containing the score sheet.
 Returns:
-    warped_img (numpy.ndarray): The resulting image of the extracted and
-    warped score sheet with sharp borders.
+    corners (dict): The "corner_points" of the page, ordered [top-left, top-right,
+    bottom-right, bottom-left].
 """
 def Paper_Extraction(image):
 
     # fileOutPath = "output/"
     # output_filename = "output_extraction.jpg"
 
-    original_img = check_extension(image)
-    if original_img is None:
-        print(f"Cannot read image file: {image}")
-        return -1
+    # Only a small grayscale copy of the image is decoded
+    gray, full_size = check_extension_reduced(image, max_dimension)
 
-    # Default corner points
-    corner_points = [
-        {"x": 50, "y": 50}, 
-        {"x": original_img.shape[1] - 50, "y": 50}, 
-        {"x": original_img.shape[1] - 50, "y": original_img.shape[0]- 50}, 
-        {"x": 50, "y": original_img.shape[0]- 50}
-        ]
+    scale = min(max_dimension / full_size[0], max_dimension / full_size[1])
+
+    return __find_corners_in_reduced_image(gray, scale, full_size)
+
+"""
+Function Brief: Locate the corners of a score sheet in an image that has already
+been decoded by detecting the largest quadrilateral contour.
+Parameters:
+    original_img (numpy.ndarray): The decoded input image containing the score sheet.
+Returns:
+    corners (dict): The "corner_points" of the page, ordered [top-left, top-right,
+    bottom-right, bottom-left].
+"""
+def Find_Page_Corners(original_img):
 
     # Resize image for faster processing, maintaining aspect ratio
-    max_dimension = 1000
     scale = min(max_dimension / original_img.shape[1], max_dimension / original_img.shape[0])
     resized_image = cv.resize(original_img, (0, 0), fx=scale, fy=scale)
 
-    # Convert to grayscale and blur
+    # Convert to grayscale
     gray = cv.cvtColor(resized_image, cv.COLOR_BGR2GRAY)
+
+    return __find_corners_in_reduced_image(gray, scale, (original_img.shape[1], original_img.shape[0]))
+
+"""
+Function Brief: Locate the corners of a score sheet in a reduced size grayscale
+copy of an image and map them back to the full size image.
+Parameters:
+    gray (numpy.ndarray): The reduced size grayscale image.
+    scale (float): The size of the reduced image relative to the full image.
+    full_size ((int, int)): The width and height of the full image.
+Returns:
+    corners (dict): The "corner_points" of the page in full size image coordinates.
+"""
+def __find_corners_in_reduced_image(gray, scale, full_size):
+
+    # Default corner points
+    corner_points = [
+        {"x": 50, "y": 50}, 
+        {"x": full_size[0] - 50, "y": 50}, 
+        {"x": full_size[0] - 50, "y": full_size[1]- 50}, 
+        {"x": 50, "y": full_size[1]- 50}
+        ]
+
+    # Blur
     blurred = cv.GaussianBlur(gray, (5, 5), 0)
 
     # Edge detection using Canny
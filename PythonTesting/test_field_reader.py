@@ -0,0 +1,81 @@
+import os
+import sys
+import unittest
+import numpy as np
+from pathlib import Path
+from unittest import mock
+
+# The backend scripts are not a package
+sys.path.append(str(Path(__file__).parent.parent / 'backend'))
+
+import FieldReader
+
+
+class FieldReaderTestCase(unittest.TestCase):
+
+    def test_uses_line_removal(self):
+
+        with mock.patch.dict(os.environ, {'OKRA_LINE_REMOVAL': 'Morphology'}):
+            self.assertTrue(FieldReader.uses_line_removal())
+
+        with mock.patch.dict(os.environ, {'OKRA_LINE_REMOVAL': 'trace'}):
+            self.assertFalse(FieldReader.uses_line_removal())
+
+        with mock.patch.dict(os.environ):
+            os.environ.pop('OKRA_LINE_REMOVAL', None)
+            self.assertFalse(FieldReader.uses_line_removal(), 'Line removal should be opt-in')
+
+
+    def test_get_digit_getter(self):
+
+        dg = FieldReader.get_digit_getter(False)
+
+        self.assertIs(FieldReader.get_digit_getter(False), dg, 'DigitGetter not reused')
+        self.assertTrue(dg.digit_candidates)
+        self.assertFalse(dg.use_width_as_reference)
+
+        ctr_dg = FieldReader.get_digit_getter(False, use_width_as_reference=True)
+
+        self.assertIsNot(ctr_dg, dg, 'The scoresheet types should not share a DigitGetter')
+        self.assertTrue(ctr_dg.use_width_as_reference)
+
+
+    def test_read_field(self):
+
+        dg = FieldReader.get_digit_getter(False)
+
+        field = np.full((40, 120, 3), 215, np.uint8)
+        field[8:32, 30:34] = 25
+        field[8:32, 70:74] = 25
+
+        # The same output as reading the field as part of a page
+        expected = dg.images_to_digits(dg.preprocess_images([field]), preprocessed=True)[0]
+
+        self.assertEqual(FieldReader.read_field(dg, field), expected, 'Field read differently')
+
+        blank_field = np.full((40, 120, 3), 215, np.uint8)
+
+        nums, confs, _ = FieldReader.read_field(dg, blank_field)
+        self.assertEqual((nums, confs), ([], []), 'Blank field should have no digits')
+
+
+    def test_remove_lines(self):
+
+        dg = FieldReader.get_digit_getter(False)
+
+        binary_field = np.zeros((40, 120), np.uint8)
+        binary_field[19:22, :] = 255
+
+        check_line_issues = dg.check_line_issues
+
+        try:
+            dg.check_line_issues = True
+            FieldReader.remove_lines(dg, [binary_field])
+            self.assertTrue(binary_field.any(), 'Lines removed while tracing finds them')
+
+            dg.check_line_issues = False
+            FieldReader.remove_lines(dg, [binary_field])
+            self.assertFalse(binary_field.any(), 'Line not removed')
+
+        finally:
+            dg.check_line_issues = check_line_issues
@@ -0,0 +1,62 @@
+import unittest
+import numpy as np
+import cv2 as cv
+
+from preprocessing import horizontal_remover
+
+
+class HorizontalRemoverTestCase(unittest.TestCase):
+
+    def test_digit_crossing_line(self):
+
+        for thickness in range(1, 6):
+
+            for digit in ['1', '0']:
+
+                img = np.zeros((40, 120), np.uint8)
+
+                # A ruling line across the field, with a digit on top of it
+                img[20 - thickness // 2:20 - thickness // 2 + thickness, :] = 255
+
+                if digit == '1':
+                    img[6:34, 58:61] = 255
+
+                else:
+                    cv.ellipse(img, (60, 20), (8, 12), 0, 0, 360, 255, 3)
+
+                cleaned_count = horizontal_remover.remove_lines_from_binary([img])
+
+                case = f'"{digit}" crossing a {thickness} px line'
+
+                self.assertEqual(cleaned_count, 1, f'{case}: Line not found')
+                self.assertFalse(img[:, :40].any(), f'{case}: Line not removed')
+                self.assertFalse(img[:, 80:].any(), f'{case}: Line not removed')
+
+                piece_count, _ = cv.connectedComponents(img)
+                self.assertEqual(piece_count - 1, 1, f'{case}: Digit split into pieces')
+
+
+    def test_blank_and_lineless_fields(self):
+
+        stroke = np.zeros((40, 120), np.uint8)
+        stroke[6:34, 58:61] = 255
+
+        original = stroke.copy()
+
+        cleaned_count = horizontal_remover.remove_lines_from_binary([None, stroke])
+
+        self.assertEqual(cleaned_count, 0, 'Found a line that is not there')
+        self.assertTrue(np.array_equal(stroke, original), 'Field without a line changed')
+
+
+    def test_remove_horizontal_lines(self):
+
+        field = np.full((40, 120), 220, np.uint8)
+        field[19:22, :] = 40
+        field[6:34, 58:61] = 30
+
+        cleaned = horizontal_remover.remove_horizontal_lines(field)
+
+        self.assertEqual(cleaned.shape, field.shape, 'Shape changed')
+        self.assertTrue((cleaned[19:22, :40] > 128).all(), 'Line not painted over')
+        self.assertTrue((cleaned[6:19, 58:61] < 128).all(), 'Digit painted over')
@@ -1,7 +1,11 @@
 import unittest
+import json
+import threading
 import numpy as np
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 
 import OCR.okra as okra
+from OCR import payload
 
 
 class DigitGetterTestCase(unittest.TestCase):
@@ -110,6 +114,70 @@ class DigitGetterTestCase(unittest.TestCase):
         self.assertEqual(boundary.right, 8, 'Bottom line failure; right boundary incorrect')
 
 
+    def test_segmentation_modes(self):
+
+        img = np.full((30, 60), 205, np.uint8)
+        img[6:24, 6:10] = 20
+        img[6:24, 20:30] = 20
+        img[20:23, 36:39] = 20
+        img[6:24, 44:52] = 20
+
+        # A line along the top of the field that touches the second digit
+        lined_img = img.copy()
+        lined_img[1:3, :] = 20
+        lined_img[1:8, 24:27] = 20
+
+        for test_img in [img, lined_img]:
+
+            segments = {}
+
+            for mode in ['trace', 'components']:
+
+                self.dg.segmentation_mode = mode
+                segments[mode] = self.dg._DigitGetter__segment_image(test_img, None)
+
+            self.dg.segmentation_mode = 'trace'
+
+            self.assertEqual(len(segments['trace']), len(segments['components']), 'Segmentation modes found a different number of segments')
+
+            for traced, component in zip(segments['trace'], segments['components']):
+
+                self.assertEqual(traced['type'], component['type'], 'Segmentation modes found different segment types')
+                self.assertTrue(np.array_equal(traced['img'], component['img']), 'Segmentation modes found different segments')
+
+        self.dg.segmentation_mode = 'unknown'
+
+        with self.assertRaises(ValueError):
+            self.dg._DigitGetter__segment_image(img, None)
+
+        self.dg.segmentation_mode = 'trace'
+
+
+    def test_components_without_line_check(self):
+
+        img = np.full((30, 60), 205, np.uint8)
+        img[6:24, 6:10] = 20
+        img[6:24, 44:52] = 20
+
+        # A line across the middle of the field that crosses the second digit
+        img[14:16, 30:60] = 20
+
+        self.dg.segmentation_mode = 'components'
+
+        try:
+            split_segments = self.dg._DigitGetter__segment_image(img, None)
+
+            self.dg.check_line_issues = False
+            segments = self.dg._DigitGetter__segment_image(img, None)
+
+        finally:
+            self.dg.segmentation_mode = 'trace'
+            self.dg.check_line_issues = True
+
+        self.assertGreater(len(split_segments), 2, 'The line should be split from the digits')
+        self.assertEqual(len(segments), 2, 'Components should not be split without the line check')
+
+
     def test_get_segment_type(self):
 
         img_shape = (46, 156)
@@ -167,3 +235,168 @@ class DigitGetterTestCase(unittest.TestCase):
         self.assertIsNotNone(num, 'Non-blank segment identified as blank')
 
 
+    def test_batched_classification(self):
+
+        blank_img = np.full((20, 40), 205, np.uint8)
+
+        digits_img = np.full((20, 40), 205, np.uint8)
+        digits_img[4:16, 6:9] = 20
+        digits_img[4:16, 24:28] = 20
+
+        batched = self.dg.images_to_digits([digits_img, blank_img, digits_img])
+
+        self.assertEqual(len(batched), 3, 'Expected one output per image')
+        self.assertEqual(batched[1], ([], []), 'Blank image should have no digits')
+
+        nums, confs = self.dg.image_to_digits(digits_img)
+
+        for i in [0, 2]:
+
+            self.assertEqual(batched[i][0], nums, 'Batched digits do not match')
+
+            for batched_conf, conf in zip(batched[i][1], confs):
+                self.assertAlmostEqual(batched_conf, conf, places=3)
+
+
+    def test_onnx_backend(self):
+
+        try:
+            onnx_dg = okra.DigitGetter(backend='onnx')
+
+        except okra.OkraModelError as e:
+            self.skipTest(str(e))
+
+        digits_img = np.full((20, 40), 205, np.uint8)
+        digits_img[4:16, 6:9] = 20
+        digits_img[4:16, 24:28] = 20
+
+        nums, confs = self.dg.image_to_digits(digits_img)
+        onnx_nums, onnx_confs = onnx_dg.image_to_digits(digits_img)
+
+        self.assertEqual(onnx_nums, nums, 'ONNX digits do not match')
+
+        for onnx_conf, conf in zip(onnx_confs, confs):
+            self.assertAlmostEqual(onnx_conf, conf, places=3)
+
+        with self.assertRaises(ValueError, msg='Unknown backend accepted'):
+            okra.DigitGetter(backend='unknown')
+
+
+    def test_handler_bad_request(self):
+
+        from OCR.OkraHandler import OkraHandler
+
+        class FakeContext:
+
+            def __init__(self):
+                self.statuses = {}
+
+            def set_response_status(self, code=200, phrase='', idx=0):
+                self.statuses[idx] = code
+
+        digits = np.zeros((2, 28, 28), np.uint8)
+        data = payload.encode(digits)
+
+        handler = OkraHandler()
+        handler.initialize()
+
+        context = FakeContext()
+        responses = handler.handle(
+            [{'body': data}, {'body': data[:9]}, {'body': None}, {'body': data}],
+            context
+        )
+
+        self.assertEqual(len(responses), 4, 'Expected one response per request')
+        self.assertEqual(context.statuses, {1: 400, 2: 400}, 'Only the bad requests should fail')
+
+        for i in [0, 3]:
+            self.assertEqual(len(json.loads(responses[i])), 2, 'Valid request was not classified')
+
+        for i in [1, 2]:
+            self.assertEqual(json.loads(responses[i])['code'], 400)
+
+
+    def test_digit_candidates(self):
+
+        digits_img = np.full((20, 40), 205, np.uint8)
+        digits_img[4:16, 6:9] = 20
+        digits_img[4:16, 24:28] = 20
+        digits_img[17:19, 15:17] = 20
+
+        self.dg.digit_candidates = True
+
+        try:
+            candidate_nums, candidate_confs, candidates = self.dg.image_to_digits(digits_img)
+
+        finally:
+            self.dg.digit_candidates = False
+
+        self.assertEqual(len(candidates), len(candidate_nums), 'One candidate list per value')
+
+        for num, conf, value_candidates in zip(candidate_nums, candidate_confs, candidates):
+
+            if num == '.':
+                self.assertIsNone(value_candidates, 'Decimal points have no candidates')
+                continue
+
+            digits = [digit for digit, _ in value_candidates]
+            candidate_confidences = [confidence for _, confidence in value_candidates]
+
+            self.assertEqual(digits[0], num, 'The predicted digit should be the first candidate')
+            self.assertAlmostEqual(candidate_confidences[0], conf, places=3)
+            self.assertEqual(len(set(digits)), len(digits), 'Repeated candidates')
+            self.assertEqual(candidate_confidences, sorted(candidate_confidences, reverse=True))
+
+
+    def test_async_torchserve_client(self):
+
+        try:
+            import aiohttp
+
+        except ImportError:
+            self.skipTest('aiohttp is not installed')
+
+        class FakeTorchServe(BaseHTTPRequestHandler):
+
+            # Predicts the mean pixel value of each image, so the order of
+            # the results can be checked
+            def do_POST(self):
+
+                imgs = payload.decode(self.rfile.read(int(self.headers['Content-Length'])))
+                body = json.dumps([
+                    {'Digit': int(img.mean()), 'Confidence': 50.0} for img in imgs
+                ]).encode()
+
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), FakeTorchServe)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        try:
+            ts_dg = okra.DigitGetter(ts=True)
+            ts_dg.ts_url = f'http://127.0.0.1:{server.server_port}'
+
+            digits_img = np.full((20, 40), 205, np.uint8)
+            digits_img[4:16, 6:9] = 20
+            digits_img[4:16, 24:28] = 20
+
+            imgs = [digits_img, np.full((20, 40), 205, np.uint8)] * 5
+
+            ts_dg.ts_async = False
+            expected = ts_dg.images_to_digits(imgs)
+
+            # Send the digits in several chunks
+            ts_dg.ts_async = True
+            ts_dg.ts_chunk_size = 3
+
+            self.assertEqual(ts_dg.images_to_digits(imgs), expected, 'Chunked results do not match')
+
+        finally:
+            server.shutdown()
+            server.server_close()
@@ -0,0 +1,46 @@
+import unittest
+import numpy as np
+
+import OCR.payload as payload
+
+
+class PayloadTestCase(unittest.TestCase):
+
+    def test_round_trip(self):
+
+        digits = np.arange(3 * 28 * 28, dtype=np.uint32).astype(np.uint8).reshape((3, 28, 28))
+
+        decoded = payload.decode(payload.encode(digits))
+
+        self.assertEqual(decoded.dtype, np.uint8, 'Data type changed')
+        self.assertEqual(decoded.shape, (3, 28, 28), 'Shape changed')
+        self.assertTrue(np.array_equal(decoded, digits), 'Data changed')
+
+        values = np.linspace(0, 1, 28 * 28, dtype=np.float32).reshape((1, 28, 28))
+
+        decoded = payload.decode(payload.encode(values))
+        self.assertTrue(np.array_equal(decoded, values), 'Float data changed')
+
+
+    def test_invalid_payloads(self):
+
+        digits = np.zeros((2, 28, 28), np.uint8)
+        data = payload.encode(digits)
+
+        with self.assertRaises(ValueError, msg='Truncated payload accepted'):
+            payload.decode(data[:-1])
+
+        with self.assertRaises(ValueError, msg='Truncated shape accepted'):
+            payload.decode(data[:payload.HEADER.size])
+
+        with self.assertRaises(ValueError, msg='Truncated shape accepted'):
+            payload.decode(data[:payload.HEADER.size + payload.DIMENSION.size])
+
+        with self.assertRaises(ValueError, msg='Invalid header accepted'):
+            payload.decode(b'JUNK' + data[4:])
+
+        with self.assertRaises(ValueError, msg='Empty payload accepted'):
+            payload.decode(b'')
+
+        with self.assertRaises(ValueError, msg='Unsupported dtype accepted'):
+            payload.encode(np.zeros((1, 28, 28), np.int64))
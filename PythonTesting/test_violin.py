@@ -142,3 +142,44 @@ class ViolinTestCase(unittest.TestCase):
             number, confidence = violin.validate_weight(test_case[0])
             self.assertEqual(number, test_case[1], f'Case {case_num}')
 
+
+
+    def test_candidate_search(self):
+
+        test_cases = [
+            # Function                 OCR output with candidates                                Expected output
+            [violin.validate_score,  ([8], [60.0], [[(8, 60.0), (3, 35.0), (0, 4.0)]]),           '3'],
+            [violin.validate_score,  ([6], [50.0], [[(6, 50.0), (0, 30.0), (5, 20.0)]]),          '0'],
+            [violin.validate_time,   ([7, 8, 5, 9], [60.0, 70.0, 99.0, 99.0], [
+                                         [(7, 60.0), (1, 30.0)], [(8, 70.0), (0, 20.0)],
+                                         [(5, 99.0)], [(9, 99.0)]
+                                     ]),                                                          '1859'],
+            [violin.validate_weight, ([4, 8, 8], [80.0, 90.0, 90.0], [
+                                         [(4, 80.0), (2, 15.0), (1, 5.0)], [(8, 90.0)], [(8, 90.0)]
+                                     ]),                                                          '288'],
+        ]
+
+        for case_num, test_case in enumerate(test_cases):
+
+            function, raw, expected = test_case
+
+            args = (5,) if function is violin.validate_score else ()
+
+            number, confidence = function(raw, *args)
+            self.assertEqual(number, expected, f'Case {case_num}')
+
+            # The confidence comes from the chosen candidate
+            self.assertLess(confidence, 50.0, f'Case {case_num}')
+
+        # The current values are not always the most probable (the earlier
+        # corrections can change them), and only the changed digits are
+        # penalized
+        number, confidence = violin.validate_time(([9, 7, 5], [5.0, 5.0, 99.0], [
+            [(2, 60.0), (1, 30.0), (9, 5.0)], [(1, 60.0), (3, 30.0), (7, 5.0)], [(5, 99.0)]
+        ]))
+        self.assertEqual(number, '215', 'Not the most probable valid time')
+        self.assertAlmostEqual(confidence, 60.0 - 2 * violin.SMALL_PENALTY)
+
+        # Without valid candidates, the value is still forced to be valid
+        number, confidence = violin.validate_score(([9], [90.0], [[(9, 90.0), (8, 10.0)]]), 5)
+        self.assertTrue(violin.a_valid_score([int(number)], 5, 0), 'Not a valid score')
@@ -1,7 +1,10 @@
-from preprocessing.scorefields import BCSegments
-from OCR import okra
+from preprocessing.scorefields import BCSegments, warp_field, save_artifact
+from preprocessing import template
 from OCR import violin as v
 import ImagePackager
+import ImageCache
+import ThreadBudget
+import FieldReader
 
 
 # A key map to convert the score-field key
@@ -17,6 +20,12 @@ key_map = {
     'rider_weight':  'Weight of this rider'
 }
 
+# The reverse of the key map
+field_key_map = {name: key for key, name in key_map.items()}
+
+# Riders with this many blank fields are left out of the results
+blank_count_threshold = 5
+
 
 def run(args, image_buffer):
     """
@@ -29,48 +38,124 @@ def run(args, image_buffer):
                      'corner_points' (dict): A dictionary containing the
                                              coordinates of the page corners
                                              (optional).
+                     'debug_artifacts' (bool): A flag to save the intermediate
+                                               images to disk for debugging
+                                               (optional).
+                     'image_token' (str): The server's token for the image
+                                          (optional).
+                     'scan_id' (str): Keeps the decoded image and its
+                                      alignment under this ID, so its fields
+                                      can be read again by reread()
+                                      (optional).
         image_buffer (bytes): The raw image data.
 
     Returns:
         dict: An array of dictionary objects containing score-field values and
-              confidences for each rider.
+              confidences for each rider, and the number of rider columns
+              that were skipped because they are empty.
     """
 
+    # Decode the image once for both the corner detection and the alignment.
+    # Images with a token may already be decoded by this worker.
+    page = ImageCache.get_scoresheet(args.get('image_token'), image_buffer)
+
     if 'corner_points' not in args.keys():
-        import corners
-        expected_corners = corners.run(None, image_buffer)
-        args['corner_points'] = expected_corners['corner_points']
+        args['corner_points'] = page.find_corners()['corner_points']
 
     # Get the score field segments
-    extracted_fields = BCSegments(image_buffer, args['corner_points'])
+    artifact_sink = save_artifact if args.get('debug_artifacts') else None
 
-    # Prepare the OCR
-    dg = okra.DigitGetter(ts=args['torchserve'])
+    transform = page.bc_transform(args['corner_points'])
 
-    rider_keys = extracted_fields.keys()
+    extracted_fields = BCSegments(page, args['corner_points'], artifact_sink, transform=transform)
 
-    rider_data = []
+    # Prepare the OCR
+    dg = FieldReader.get_digit_getter(args['torchserve'])
+
+    # Convert the fields to grayscale and binarize them for the OCR all at
+    # once (the color fields are kept for the images in the response)
+    binary_fields = iter(dg.preprocess_images([
+        field_image
+        for rider_segments in extracted_fields.values()
+        for field_image in rider_segments.values()
+    ]))
+
+    binary_segments = {
+        rider_key: [next(binary_fields) for _ in rider_segments]
+        for rider_key, rider_segments in extracted_fields.items()
+    }
+
+    # Skip the OCR of the rider columns that are clearly empty. A blank field
+    # is always read as an empty value, so are_blank() would discard them.
+    rider_keys = [
+        rider_key for rider_key in extracted_fields.keys()
+        if count_blank_fields(binary_segments[rider_key]) < blank_count_threshold
+    ]
+
+    skipped_rider_count = len(extracted_fields) - len(rider_keys)
+
+    # Run the OCR on every field of the sheet at once
+    field_images = []
+    digit_counts = []
 
     for rider_key in rider_keys:
+        for key_num, binary_field in enumerate(binary_segments[rider_key]):
+
+            field_images.append(binary_field)
+            digit_counts.append(3 if key_num >= 6 else None)
+
+    # Remove the ruling lines before segmenting, if they are not found while
+    # tracing (see FieldReader.uses_line_removal)
+    FieldReader.remove_lines(dg, field_images)
 
-        scanned_vals = process_rider_fields(extracted_fields[rider_key], dg)
+    raw_outputs = dg.images_to_digits(field_images, digit_counts, preprocessed=True)
+
+    rider_segments = [extracted_fields[rider_key] for rider_key in rider_keys]
+    rider_outputs = [
+        raw_outputs[rider_num * len(segments):(rider_num + 1) * len(segments)]
+        for rider_num, segments in enumerate(rider_segments)
+    ]
+
+    # Validate and encode the riders' fields (at the same time if there is a
+    # field thread pool)
+    all_scanned_vals = ThreadBudget.field_map(process_rider_fields, rider_segments, rider_outputs)
+
+    rider_data = []
+    scanned_rider_keys = []
+
+    for rider_key, scanned_vals in zip(rider_keys, all_scanned_vals):
 
         if (are_blank(scanned_vals)):
             continue
 
         rider_data.append(scanned_vals)
+        scanned_rider_keys.append(rider_key)
+
+    if args.get('scan_id') is not None:
+
+        ImageCache.put_scan(args['scan_id'], {
+            'script': 'BCE.py',
+            'page': page,
+            'transform': transform,
+            'rider_keys': scanned_rider_keys
+        })
 
-    return { 'riderData': rider_data, 'riderCount': len(rider_data) }
+    return {
+        'riderData': rider_data,
+        'riderCount': len(rider_data),
+        'skippedRiders': skipped_rider_count
+    }
 
 
-def process_rider_fields(rider_segments, dg):
+def process_rider_fields(rider_segments, raw_outputs):
     """
     Processes all the score-fields for a single rider.
 
     Parameters:
         rider_segments (dict): A dictionary containing the image segments
                         for a single rider's score fields.
-        dg (okra.DigitGetter): An instance of the OCR class.
+        raw_outputs (list): The raw OCR output for each of the rider's score
+                            fields (see okra.DigitGetter.images_to_digits).
 
     Returns:
         dict: A dictionary containing values and confidences for each
@@ -83,46 +168,105 @@ def process_rider_fields(rider_segments, dg):
 
     for key_num, field_key in enumerate(field_keys):
 
-        if key_num >= 6:
-            number_length = 3
+        rider_output[key_map[field_key]] = process_field(
+            key_num,
+            raw_outputs[key_num],
+            rider_segments[field_key]
+        )
 
-        else:
-            number_length = None
+    return rider_output
+
+
+def process_field(key_num, raw_out, field_image):
+    """
+    Validates the OCR output of a single score-field.
 
-        # Run the OCR
-        raw_out = dg.image_to_digits(rider_segments[field_key], number_length)
+    Parameters:
+        key_num (int): The position of the score-field in the rider's column.
+        raw_out (list, list): The raw OCR output of the score-field.
+        field_image (numpy.ndarray): The image of the score-field.
 
-        # Use the appropriate validation
-        #
-        if key_num == 0:
-            num, conf = v.validate_rider_number(raw_out)
+    Returns:
+        dict: The value, confidence, and image of the score-field.
+    """
 
-        elif key_num == 6:
-            num, conf = v.validate_time(raw_out)
+    # Use the appropriate validation
+    #
+    if key_num == 0:
+        num, conf = v.validate_rider_number(raw_out)
 
-        elif key_num == 7:
-            num, conf = v.validate_weight(raw_out)
+    elif key_num == 6:
+        num, conf = v.validate_time(raw_out)
 
-        else:
-            num, conf = v.validate_score(raw_out, 10, 1)
+    elif key_num == 7:
+        num, conf = v.validate_weight(raw_out)
 
-        encoded_image = ImagePackager.encode_base64(rider_segments[field_key])
+    else:
+        num, conf = v.validate_score(raw_out, 10, 1)
 
-        # Save results
-        rider_output[key_map[field_key]] = {
-            'value': num,
-            'confidence': conf,
-            'image': encoded_image
-        }
+    encoded_image = ImagePackager.encode_base64(field_image)
 
-    return rider_output
+    return {
+        'value': num,
+        'confidence': conf,
+        'image': encoded_image
+    }
+
+
+def reread(args, scan):
+    """
+    Reads a single score-field of a scan again, without processing the rest
+    of the scoresheet.
+
+    Parameters:
+        args (dict): A dictionary containing the arguments:
+                     'torchserve' (bool): A flag to specify whether TorchServe
+                                          should be used or not.
+                     'rider' (int): The index of the rider in the 'riderData'
+                                    of the scan.
+                     'field' (str): The name of the score-field
+                                    (e.g. 'Recovery').
+                     'offset' (dict): The 'x' and 'y' distance (in pixels of
+                                      the template) to move the score-field
+                                      by (optional).
+        scan (dict): The scan that was stored by run().
+
+    Returns:
+        dict: The value, confidence, and image of the score-field.
+
+    Raises:
+        ScanLookupError: The rider or the score-field is not on the scan.
+    """
+
+    rider = args.get('rider', 0)
+
+    if not isinstance(rider, int) or not 0 <= rider < len(scan['rider_keys']):
+        raise ImageCache.ScanLookupError(f'Rider {rider} is not on the scan')
+
+    if args.get('field') not in field_key_map:
+        raise ImageCache.ScanLookupError(f'"{args.get("field")}" is not a score-field')
+
+    rider_fields = template.BC_TEMPLATE_FIELDS[scan['rider_keys'][rider]]
+
+    field_key = field_key_map[args['field']]
+    key_num = list(rider_fields.keys()).index(field_key)
+
+    field_image = warp_field(
+        scan['page'], scan['transform'], rider_fields[field_key],
+        (template.BC_WIDTH, template.BC_HEIGHT), args.get('offset')
+    )
+
+    dg = FieldReader.get_digit_getter(args['torchserve'])
+
+    raw_out = FieldReader.read_field(dg, field_image, 3 if key_num >= 6 else None)
+
+    return process_field(key_num, raw_out, field_image)
 
 
 def are_blank(fields):
     """ Returns True if the fields are empty and False otherwise"""
 
     blank_field_count = 0
-    blank_count_threshold = 5
 
     for key in fields.keys():
 
@@ -135,6 +279,29 @@ def are_blank(fields):
     return False
 
 
+def count_blank_fields(binary_fields):
+    """
+    Returns the number of fields without any handwriting (see
+    okra.DigitGetter.preprocess_images)
+    """
+
+    return sum(1 for binary_field in binary_fields if binary_field is None)
+
+
+def warm_up(args):
+    """
+    Prepares everything that is expensive to create ahead of the first run.
+    This is called by long-lived workers (see jsconnect.py).
+
+    Parameters:
+        args (dict): A dictionary containing the arguments:
+                     'torchserve' (bool): A flag to specify whether TorchServe
+                                          should be used or not.
+    """
+
+    FieldReader.get_digit_getter(args['torchserve'])
+
+
 def _debug_main():
 
     import sys
@@ -152,7 +319,7 @@ def _debug_main():
         print(f'\n  Cannot open "{sys.argv[1]}"\n')
         return
 
-    ret_val = run({'torchserve': False}, image_buffer)
+    ret_val = run({'torchserve': False, 'debug_artifacts': True}, image_buffer)
 
     for riderNumber in range(ret_val['riderCount']):
 
@@ -1,7 +1,10 @@
-from preprocessing.scorefields import CTRSegments
-from OCR import okra
+from preprocessing.scorefields import CTRSegments, warp_field, save_artifact
+from preprocessing import template
 from OCR import violin as v
 import ImagePackager
+import ImageCache
+import ThreadBudget
+import FieldReader
 
 
 max_score_per_field = [5, 5, 5, 5, 5, 3, 0, 2, 5, 5, 20, 5, 10, 25, 5, 5, None, None]
@@ -38,6 +41,15 @@ def run(args, image_buffer):
                      'corner_points' (dict): A dictionary containing the
                                              coordinates of the page corners
                                              (optional).
+                     'debug_artifacts' (bool): A flag to save the intermediate
+                                               images to disk for debugging
+                                               (optional).
+                     'image_token' (str): The server's token for the image
+                                          (optional).
+                     'scan_id' (str): Keeps the decoded image and its
+                                      alignment under this ID, so its fields
+                                      can be read again by reread()
+                                      (optional).
         image_buffer (bytes): The raw image data.
 
     Returns:
@@ -45,40 +57,143 @@ def run(args, image_buffer):
               score-field.
     """
 
+    # Decode the image once for both the corner detection and the alignment.
+    # Images with a token may already be decoded by this worker.
+    page = ImageCache.get_scoresheet(args.get('image_token'), image_buffer)
+
     if 'corner_points' not in args.keys():
-        import corners
-        expected_corners = corners.run(None, image_buffer)
-        args['corner_points'] = expected_corners['corner_points']
+        args['corner_points'] = page.find_corners()['corner_points']
 
     # Get the score field segments
-    extracted_fields = CTRSegments(image_buffer, args['corner_points'])
+    artifact_sink = save_artifact if args.get('debug_artifacts') else None
+
+    transform = page.ctr_transform(args['corner_points'])
+
+    extracted_fields = CTRSegments(page, args['corner_points'], artifact_sink, transform=transform)
 
     # Prepare the OCR
-    dg = okra.DigitGetter(ts=args['torchserve'])
-    dg.use_width_as_reference = True
+    dg = FieldReader.get_digit_getter(args['torchserve'], use_width_as_reference=True)
 
-    output_dict = {}
+    field_keys = [key for key in extracted_fields.keys() if key != 'gut_sounds']
 
-    for field_num, key in enumerate(extracted_fields.keys()):
+    # Convert the fields to grayscale and binarize them for the OCR all at
+    # once (the color fields are kept for the images in the response)
+    binary_fields = dg.preprocess_images([extracted_fields[key] for key in field_keys])
 
-        if key == 'gut_sounds':
-            continue
+    # Remove the ruling lines before segmenting, if they are not found while
+    # tracing (see FieldReader.uses_line_removal)
+    FieldReader.remove_lines(dg, binary_fields)
+
+    # Run the OCR on every field of the sheet at once
+    raw_outputs = dg.images_to_digits(binary_fields, preprocessed=True)
+    raw_outputs = dict(zip(field_keys, raw_outputs))
 
-        raw_ouput = dg.image_to_digits(extracted_fields[key])
-        num, conf = v.validate_score(raw_ouput, max_score_per_field[field_num])
+    field_nums = [list(extracted_fields.keys()).index(key) for key in field_keys]
 
-        encoded_image = ImagePackager.encode_base64(extracted_fields[key])
+    # Validate and encode the fields (at the same time if there is a field
+    # thread pool)
+    processed_fields = ThreadBudget.field_map(
+        process_field,
+        field_nums,
+        [raw_outputs[key] for key in field_keys],
+        [extracted_fields[key] for key in field_keys]
+    )
 
-        # Save results
-        output_dict[out_field_keys[field_num]] = {
-            'value': num,
-            'confidence': conf,
-            'image': encoded_image
-        }
+    output_dict = {
+        out_field_keys[field_num]: field
+        for field_num, field in zip(field_nums, processed_fields)
+    }
+
+    if args.get('scan_id') is not None:
+
+        ImageCache.put_scan(args['scan_id'], {
+            'script': 'CTR.py',
+            'page': page,
+            'transform': transform
+        })
 
     return output_dict
 
 
+def process_field(field_num, raw_out, field_image):
+    """
+    Validates the OCR output of a single score-field.
+
+    Parameters:
+        field_num (int): The position of the score-field on the scoresheet.
+        raw_out (list, list): The raw OCR output of the score-field.
+        field_image (numpy.ndarray): The image of the score-field.
+
+    Returns:
+        dict: The value, confidence, and image of the score-field.
+    """
+
+    num, conf = v.validate_score(raw_out, max_score_per_field[field_num])
+
+    encoded_image = ImagePackager.encode_base64(field_image)
+
+    return {
+        'value': num,
+        'confidence': conf,
+        'image': encoded_image
+    }
+
+
+def reread(args, scan):
+    """
+    Reads a single score-field of a scan again, without processing the rest
+    of the scoresheet.
+
+    Parameters:
+        args (dict): A dictionary containing the arguments:
+                     'torchserve' (bool): A flag to specify whether TorchServe
+                                          should be used or not.
+                     'field' (str): The name of the score-field
+                                    (e.g. 'Skin Pinch').
+                     'offset' (dict): The 'x' and 'y' distance (in pixels of
+                                      the template) to move the score-field
+                                      by (optional).
+        scan (dict): The scan that was stored by run().
+
+    Returns:
+        dict: The value, confidence, and image of the score-field.
+
+    Raises:
+        ScanLookupError: The score-field is not on the scan.
+    """
+
+    field = args.get('field')
+
+    if field not in out_field_keys or field == 'Gut Sounds':
+        raise ImageCache.ScanLookupError(f'"{field}" is not a score-field')
+
+    field_num = out_field_keys.index(field)
+    region = list(template.CTR_TEMPLATE_FIELDS.values())[field_num]
+
+    field_image = warp_field(
+        scan['page'], scan['transform'], region,
+        (template.CTR_WIDTH, template.CTR_HEIGHT), args.get('offset')
+    )
+
+    dg = FieldReader.get_digit_getter(args['torchserve'], use_width_as_reference=True)
+
+    return process_field(field_num, FieldReader.read_field(dg, field_image), field_image)
+
+
+def warm_up(args):
+    """
+    Prepares everything that is expensive to create ahead of the first run.
+    This is called by long-lived workers (see jsconnect.py).
+
+    Parameters:
+        args (dict): A dictionary containing the arguments:
+                     'torchserve' (bool): A flag to specify whether TorchServe
+                                          should be used or not.
+    """
+
+    FieldReader.get_digit_getter(args['torchserve'], use_width_as_reference=True)
+
+
 def _debug_main():
 
     import sys
@@ -96,7 +211,7 @@ def _debug_main():
         print(f'\n  Cannot open "{sys.argv[1]}"\n')
         return
 
-    ret_val = run({'torchserve': False}, image_buffer)
+    ret_val = run({'torchserve': False, 'debug_artifacts': True}, image_buffer)
 
     for key in ret_val.keys():
 
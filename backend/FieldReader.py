@@ -0,0 +1,83 @@
+import os
+from preprocessing import horizontal_remover
+from OCR import okra
+import ThreadBudget
+
+
+# DigitGetter instances are reused across runs within the same process
+__digit_getters = {}
+
+
+def get_digit_getter(torchserve, use_width_as_reference=False):
+    """
+    Returns this process's DigitGetter for the given inference mode. The
+    scoresheet scripts share them (see BCE.py and CTR.py).
+
+    Parameters:
+        torchserve (bool): A flag to specify whether TorchServe should be
+                           used or not.
+        use_width_as_reference (bool): Passed on to the DigitGetter (the CTR
+                                       fields are wider than they are tall).
+
+    Returns:
+        okra.DigitGetter: The DigitGetter.
+    """
+
+    key = (torchserve, use_width_as_reference)
+
+    if key not in __digit_getters:
+
+        dg = okra.DigitGetter(ts=torchserve)
+        dg.use_width_as_reference = use_width_as_reference
+        dg.executor = ThreadBudget.get_field_executor()
+        dg.check_line_issues = not uses_line_removal()
+
+        # Let the validation pick the classifier's next best digits instead of
+        # guessing when a value is out of range
+        dg.digit_candidates = True
+
+        __digit_getters[key] = dg
+
+    return __digit_getters[key]
+
+
+def uses_line_removal():
+    """
+    Returns True if the ruling lines are removed from the fields before they
+    are segmented (OKRA_LINE_REMOVAL=morphology), instead of being found
+    while tracing each piece of handwriting.
+    """
+
+    return os.environ.get('OKRA_LINE_REMOVAL', 'trace').lower() == 'morphology'
+
+
+def remove_lines(dg, binary_fields):
+    """
+    Removes the ruling lines from the binary fields (in place) if the
+    DigitGetter doesn't look for them while tracing.
+    """
+
+    if not dg.check_line_issues:
+        horizontal_remover.remove_lines_from_binary(binary_fields)
+
+
+def read_field(dg, field_image, expected_digit_count=None):
+    """
+    Runs the OCR on a single field the same way the scoresheet scripts do
+    for a whole page.
+
+    Parameters:
+        dg (okra.DigitGetter): The DigitGetter (see get_digit_getter).
+        field_image (numpy.ndarray): The color image of the field.
+        expected_digit_count (int): The number of digits in the field, if it
+                                    is known.
+
+    Returns:
+        The raw OCR output of the field (see okra.DigitGetter.images_to_digits).
+    """
+
+    binary_fields = dg.preprocess_images([field_image])
+
+    remove_lines(dg, binary_fields)
+
+    return dg.images_to_digits(binary_fields, [expected_digit_count], preprocessed=True)[0]
@@ -0,0 +1,111 @@
+from collections import OrderedDict
+
+from preprocessing.pipeline import ScoresheetImage
+
+
+class ScanLookupError(LookupError):
+    """A scan (or a field of it) is not cached by this process"""
+
+
+class LRUCache:
+    """A dictionary that only keeps its most recently used entries"""
+
+    def __init__(self, max_entries):
+
+        self.max_entries = max_entries
+        self.__entries = OrderedDict()
+
+
+    def get(self, key):
+        """Returns the value stored for a key, or None if there isn't one"""
+
+        if key not in self.__entries:
+            return None
+
+        self.__entries.move_to_end(key)
+
+        return self.__entries[key]
+
+
+    def put(self, key, value):
+        """Stores a value, evicting the least recently used entries if full"""
+
+        self.__entries[key] = value
+        self.__entries.move_to_end(key)
+
+        while len(self.__entries) > self.max_entries:
+            self.__entries.popitem(last=False)
+
+
+# Decoded images keyed by their image token. Each one holds a full size photo
+# (and its grayscale copy), so only a couple are kept.
+__scoresheets = LRUCache(max_entries=2)
+
+# Processed scans keyed by their scan ID, so single fields can be read again.
+# Each one keeps its decoded image (shared with __scoresheets when the image
+# has a token) and the page alignment, and only the fields that are read
+# again are warped.
+__scans = LRUCache(max_entries=4)
+
+
+def get_scoresheet(image_token, image_buffer):
+    """
+    Returns the decoded scoresheet image for an upload. Images uploaded with a
+    token are kept in the cache, so a long-lived worker that processes the
+    same token again does not need to decode the image again.
+
+    Parameters:
+        image_token (str): The image token given by the server, or None.
+        image_buffer (bytes): The raw image data.
+
+    Returns:
+        ScoresheetImage: The decoded image.
+    """
+
+    if image_token is None:
+        return ScoresheetImage(image_buffer)
+
+    page = __scoresheets.get(image_token)
+
+    if page is None:
+        page = ScoresheetImage(image_buffer)
+        __scoresheets.put(image_token, page)
+
+    return page
+
+
+def put_scan(scan_id, scan):
+    """
+    Keeps the result of processing a scoresheet for later re-reads.
+
+    Parameters:
+        scan_id (str): The scan ID given by the server.
+        scan (dict): The 'script' that processed the scan, its decoded
+                     'page' (ScoresheetImage) and the 'transform' that aligns
+                     it with the template, and anything else the script needs
+                     to find its fields.
+    """
+
+    __scans.put(scan_id, scan)
+
+
+def get_scan(scan_id):
+    """
+    Returns a scan that was stored by put_scan().
+
+    Parameters:
+        scan_id (str): The scan ID given by the server.
+
+    Returns:
+        dict: The stored scan.
+
+    Raises:
+        ScanLookupError: The scan is unknown or was evicted.
+    """
+
+    scan = __scans.get(scan_id)
+
+    if scan is None:
+        raise ScanLookupError(f'Scan "{scan_id}" is unknown or has expired')
+
+    return scan
@@ -0,0 +1,142 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+
+# The environment variables that limit the threads of the BLAS and OpenMP
+# libraries. They only have an effect before numpy and PyTorch are imported,
+# so the server sets them when it starts each Python process (see
+# pyconnect.js). The same variables are set by set_thread_environment().
+THREAD_ENV_VARS = [
+    'OMP_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS',
+    'OKRA_ONNX_THREADS'
+]
+
+
+def get_thread_count():
+    """
+    Returns the number of threads this process may use, as given by the
+    PYTHON_THREADS environment variable, or None if it is not limited.
+    """
+
+    try:
+        threads = int(os.environ.get('PYTHON_THREADS', ''))
+
+    except ValueError:
+        return None
+
+    return threads if threads > 0 else None
+
+
+def set_thread_environment(threads):
+    """
+    Sets the thread environment variables for this process and the processes
+    it starts. This has to be called before numpy is imported.
+
+    Parameters:
+        threads (int): The number of threads per process.
+    """
+
+    os.environ['PYTHON_THREADS'] = str(threads)
+
+    for variable in THREAD_ENV_VARS:
+        os.environ[variable] = str(threads)
+
+
+def apply(threads=None):
+    """
+    Limits the thread pools of OpenCV and PyTorch (if it has been loaded) in
+    this process. Without a limit, both start one thread per core in every
+    process, which oversubscribes the CPU when several workers run at once.
+
+    Parameters:
+        threads (int): The number of threads (defaults to get_thread_count()).
+                       Nothing is changed if there is no limit.
+    """
+
+    if threads is None:
+        threads = get_thread_count()
+
+    if threads is None:
+        return
+
+    import cv2
+    cv2.setNumThreads(threads)
+
+    # PyTorch is only configured if it is used (the ONNX and TorchServe
+    # backends don't load it)
+    torch = sys.modules.get('torch')
+
+    if torch is not None:
+
+        torch.set_num_threads(threads)
+
+        try:
+            # The workers run one batch at a time, so there is nothing to run
+            # in parallel between operators
+            torch.set_num_interop_threads(1)
+
+        except RuntimeError:
+            # This can only be set before PyTorch runs anything in parallel
+            pass
+
+
+# The thread pool used to process the fields of a scoresheet (see
+# get_field_executor)
+__field_executor = None
+
+
+def get_field_thread_count():
+    """
+    Returns the number of threads used to process the fields of a scoresheet
+    at the same time, as given by the PYTHON_FIELD_THREADS environment
+    variable (default=1).
+    """
+
+    try:
+        threads = int(os.environ.get('PYTHON_FIELD_THREADS', ''))
+
+    except ValueError:
+        return 1
+
+    return max(threads, 1)
+
+
+def get_field_executor():
+    """
+    Returns this process's thread pool for processing score-fields, or None
+    if they are processed one at a time.
+    """
+
+    global __field_executor
+
+    threads = get_field_thread_count()
+
+    if threads <= 1:
+        return None
+
+    if __field_executor is None:
+        __field_executor = ThreadPoolExecutor(threads, thread_name_prefix='field')
+
+    return __field_executor
+
+
+def field_map(function, *iterables):
+    """
+    Calls a function on each item like map(), with the field thread pool if
+    there is one.
+
+    Returns:
+        list: The results in the same order as the items.
+    """
+
+    executor = get_field_executor()
+
+    if executor is None:
+        return list(map(function, *iterables))
+
+    return list(executor.map(function, *iterables))
@@ -0,0 +1,124 @@
+'''
+Measures the scoresheet throughput of several Python workers running at the
+same time, for different splits of the CPU cores between the workers. Each
+split is run with the thread budget (see ThreadBudget.py) and without it
+(every library starts one thread per core in every worker).
+
+Run from the backend directory:
+
+    python benchmark_threads.py [sheets per worker]
+'''
+
+import os
+import sys
+import time
+import multiprocessing
+from pathlib import Path
+from contextlib import redirect_stdout
+
+import ThreadBudget
+
+
+SAMPLE_FOLDER = Path(__file__).parent.parent / 'Python' / 'Preprocessing_Package' / 'preprocessing' / 'bc'
+
+# The number of sheets each worker processes
+DEFAULT_SHEETS_PER_WORKER = 4
+
+
+def worker(threads, sheet_paths, barrier, results):
+    """Processes the sheets like a pre-warmed jsconnect.py worker"""
+
+    # The BLAS and OpenMP thread counts are read when numpy is imported
+    if threads:
+        ThreadBudget.set_thread_environment(threads)
+
+    with open(os.devnull, 'w') as null_device:
+        with redirect_stdout(null_device):
+
+            import BCE
+
+            BCE.warm_up({'torchserve': False})
+            ThreadBudget.apply(threads)
+
+            buffers = [path.read_bytes() for path in sheet_paths]
+
+            # Wait for every worker to be ready
+            barrier.wait()
+
+            latencies = []
+
+            for buffer in buffers:
+
+                start = time.perf_counter()
+                BCE.run({'torchserve': False}, buffer)
+                latencies.append(time.perf_counter() - start)
+
+    results.put(latencies)
+
+
+def run_split(worker_count, threads, sheet_paths):
+    """
+    Runs the workers at the same time.
+
+    Returns:
+        float: The number of sheets per second.
+        float: The 95th percentile latency of a sheet in seconds.
+    """
+
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(worker_count + 1)
+    results = context.Queue()
+
+    processes = [
+        context.Process(target=worker, args=(threads, sheet_paths, barrier, results))
+        for _ in range(worker_count)
+    ]
+
+    for process in processes:
+        process.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+
+    latencies = []
+
+    for _ in processes:
+        latencies.extend(results.get())
+
+    elapsed = time.perf_counter() - start
+
+    for process in processes:
+        process.join()
+
+    latencies.sort()
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+
+    return len(latencies) / elapsed, p95
+
+
+def main():
+
+    sheets_per_worker = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_SHEETS_PER_WORKER
+
+    sheet_paths = sorted(SAMPLE_FOLDER.glob('BC-*.jpg'))[:sheets_per_worker]
+
+    cores = os.cpu_count()
+    worker_counts = [w for w in [1, 2, 4, 8, 16, 32] if w <= max(cores, 2)]
+
+    print(f'{cores} cores, {len(sheet_paths)} sheets per worker\n')
+    print(f'{"workers":>7} {"threads":>8} {"sheets/s":>9} {"p95 (s)":>8}')
+
+    for worker_count in worker_counts:
+
+        budget = max(1, cores // worker_count)
+
+        for threads in [budget, None]:
+
+            throughput, p95 = run_split(worker_count, threads, sheet_paths)
+
+            label = str(threads) if threads else 'default'
+            print(f'{worker_count:>7} {label:>8} {throughput:>9.2f} {p95:>8.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,21 @@
+import ImageCache
+
+
 def run(args, image_buffer):
+
+    image_token = args.get('image_token') if args else None
+
+    if image_token is not None:
+
+        # Decode the image through the worker's cache, so the /bce or /ctr
+        # request that uses the token (sent to the same worker) does not need
+        # to decode it again
+        return ImageCache.get_scoresheet(image_token, image_buffer).find_corners()
+
     from preprocessing.scoresheet import Paper_Extraction
 
-    # Perform paper extraction to get corners and warped image
+    # Without a worker to keep the image, only a reduced size copy of it is
+    # decoded to find the corners
     expected_corners = Paper_Extraction(image_buffer)
 
     if expected_corners == -1:
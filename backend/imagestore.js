@@ -0,0 +1,112 @@
+const crypto = require('crypto')
+
+
+//
+// Keeps uploaded images in memory so they can be referred to by a token in
+// later requests, instead of being uploaded again.
+//
+// Images expire after 'ttl' milliseconds. When the total size of the stored
+// images exceeds 'maxBytes', the least recently used images are evicted.
+//
+class ImageStore
+{
+    constructor(options)
+    {
+        this.ttl = options.ttl
+        this.maxBytes = options.maxBytes
+        this.totalBytes = 0
+
+        // Map iteration follows insertion order, so the least recently used
+        // entry is always first
+        this.entries = new Map()
+
+        // Periodically remove expired images
+        this.sweepTimer = setInterval(() => this.sweep(), Math.max(this.ttl / 2, 1000))
+        this.sweepTimer.unref()
+    }
+
+    //
+    // Stores an uploaded image (an express-fileupload file object)
+    //
+    // Returns the token for the image, or null if the image is too big to store
+    //
+    put(image)
+    {
+        if (image.size > this.maxBytes)
+        {
+            return null
+        }
+
+        let token = crypto.randomUUID()
+
+        this.entries.set(token, {
+            image: { data: image.data, size: image.size, mimetype: image.mimetype },
+            expires: Date.now() + this.ttl
+        })
+
+        this.totalBytes += image.size
+
+        // Evict the least recently used images until the store fits
+        for (let [oldToken, entry] of this.entries)
+        {
+            if (this.totalBytes <= this.maxBytes)
+            {
+                break
+            }
+
+            this.delete(oldToken, entry)
+        }
+
+        return token
+    }
+
+    //
+    // Returns the image for a token, or null if the token is unknown or expired
+    //
+    get(token)
+    {
+        let entry = this.entries.get(token)
+
+        if (!entry)
+        {
+            return null
+        }
+
+        if (entry.expires <= Date.now())
+        {
+            this.delete(token, entry)
+            return null
+        }
+
+        // Move the entry to the end, since it is now the most recently used
+        this.entries.delete(token)
+        this.entries.set(token, entry)
+
+        return entry.image
+    }
+
+    //
+    // Removes all the expired images
+    //
+    sweep()
+    {
+        let now = Date.now()
+
+        for (let [token, entry] of this.entries)
+        {
+            if (entry.expires <= now)
+            {
+                this.delete(token, entry)
+            }
+        }
+    }
+
+    delete(token, entry)
+    {
+        this.entries.delete(token)
+        this.totalBytes -= entry.image.size
+    }
+}
+
+
+exports.ImageStore = ImageStore
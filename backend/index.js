@@ -4,9 +4,11 @@ const fileUpload = require('express-fileupload')
 const cors = require('cors');
 const cookieParser = require('cookie-parser')
 const path = require('path')
+const crypto = require('crypto')
 const rateLimit = require('express-rate-limit')
 const morgan = require('morgan')
 const pyconnect = require('./pyconnect')
+const { ImageStore } = require('./imagestore')
 
 const devMode = process.env.MODE
 const corsOrigin = (process.env.ORIGIN) ? process.env.ORIGIN : '*'
@@ -14,6 +16,44 @@ const corsOrigin = (process.env.ORIGIN) ? process.env.ORIGIN : '*'
 // A flag that determines if TorchServe is used or not
 const torchserveFlag = (process.env.TORCHSERVE) ? process.env.TORCHSERVE.toLowerCase() === 'torchserve' : false
 
+// A flag that makes the Python code save its intermediate images for debugging
+const debugArtifactsFlag = (process.env.DEBUG_ARTIFACTS) ? process.env.DEBUG_ARTIFACTS.toLowerCase() === 'true' : false
+
+// How long (in seconds) an image uploaded to /corners can be referred to by its token
+const imageTokenTTL = (process.env.IMAGE_TOKEN_TTL) ? Number(process.env.IMAGE_TOKEN_TTL) : 600
+
+// The total size (in mebibytes) of the images kept for their tokens
+const imageStoreSize = (process.env.IMAGE_STORE_SIZE) ? Number(process.env.IMAGE_STORE_SIZE) : 256
+
+// Images uploaded to /corners, so /bce and /ctr can use them without a second upload
+const imageStore = new ImageStore({
+  ttl: imageTokenTTL * 1000,
+  maxBytes: imageStoreSize * 1024 * 1024
+})
+
+
+// Middleware function to look up an image that was already uploaded to /corners
+function resolveImageToken(req, res, next) {
+
+  // An uploaded file always takes precedence over a token
+  if ((!req.files || !req.files.image) && req.body && req.body.image_token) {
+
+    const image = imageStore.get(req.body.image_token)
+
+    if (!image) {
+      let errorMessage = 'Image token is unknown or has expired'
+      console.warn(errorMessage)
+      return res.status(404).json({'error': errorMessage});
+    }
+
+    req.files = { image: image }
+    req.image_token = req.body.image_token
+  }
+
+  // If all checks pass, proceed
+  next();
+}
+
 
 // Middleware function to validate the image input by the user
 function validateImage(req, res, next) {
@@ -85,6 +125,50 @@ function validateCorners(req, res, next) {
 }
 
 
+// Middleware function to validate the input of a field re-read
+function validateReread(req, res, next) {
+
+  if (!req.body || typeof req.body.scan_id !== 'string' || typeof req.body.field !== 'string') {
+    let errorMessage = 'A scan_id and a field are required'
+    console.warn(errorMessage)
+    return res.status(400).json({'error': errorMessage});
+  }
+
+  let args = { "scan_id": req.body.scan_id, "field": req.body.field }
+
+  if (req.body.rider !== undefined) {
+    args.rider = Number(req.body.rider)
+
+    if (!Number.isInteger(args.rider)) {
+      let errorMessage = 'Rider is not an integer'
+      console.warn(errorMessage)
+      return res.status(400).json({'error': errorMessage});
+    }
+  }
+
+  if (req.body.offset) {
+    try {
+      var offset = JSON.parse(req.body.offset)
+
+      if (!Number.isInteger(offset.x || 0) || !Number.isInteger(offset.y || 0)) {
+        throw 'The offset is not a pair of integers'
+      }
+    }
+    catch (e) {
+      console.error(e)
+      return res.status(400).json({'error': 'Offset data is not valid JSON'})
+    }
+
+    args.offset = { "x": offset.x || 0, "y": offset.y || 0 }
+  }
+
+  req.reread_args = args
+
+  // If all checks pass, proceed
+  next();
+}
+
+
 // The express app
 const app = express();
 
@@ -111,6 +195,7 @@ else {
 const corsOptions = {
   origin: corsOrigin,
   optionsSuccessStatus: 200,
+  exposedHeaders: ['Scan-Id'],
 };
 app.use(cors(corsOptions))
 
@@ -135,36 +220,68 @@ app.use(limiter)
 
 // Retrieve the uploaded image from the handleSubmit function in frontend/src/pages/crt/getPhotos.js
 
-app.post('/ctr', validateImage, validateCorners, async (req, res) => {
+app.post('/ctr', resolveImageToken, validateImage, validateCorners, async (req, res) => {
   // The name of the input field (i.e. "sampleFile") is used to retrieve the uploaded file
   let sampleFile = req.files.image;
 
   //console.log('File received:', sampleFile.name);  // Log file details
 
-  let args = { "torchserve": torchserveFlag }
+  let args = { "torchserve": torchserveFlag, "debug_artifacts": debugArtifactsFlag }
 
   if (req.corner_points)
     args.corner_points = req.corner_points
 
-  // Send the image to the Python code to be processed
-  let output = await pyconnect.run('CTR.py', args, sampleFile)
+  if (req.image_token)
+    args.image_token = req.image_token
+
+  // A worker keeps the decoded image under this ID for /reread. The image
+  // token is reused, so a scan of the same image replaces the previous one.
+  // Without workers, nothing outlives the request.
+  let scanId = (pyconnect.workersRunning()) ? req.image_token || crypto.randomUUID() : null
+
+  if (scanId)
+    args.scan_id = scanId
+
+  // Send the image to the Python code to be processed. Requests for the same
+  // image are sent to the same worker when possible, since it may have already
+  // decoded the image.
+  let output = await pyconnect.run('CTR.py', args, sampleFile, scanId || req.image_token)
+
+  if (output.status === 200 && scanId)
+    res.set('Scan-Id', scanId)
 
   res.status(output.status).json(output.body)
 });
 
-app.post('/bce', validateImage, validateCorners, async (req, res) => {
+app.post('/bce', resolveImageToken, validateImage, validateCorners, async (req, res) => {
   // The name of the input field (i.e. "sampleFile") is used to retrieve the uploaded file
   let sampleFile = req.files.image;
 
   //console.log('File received:', sampleFile.name);  // Log file details
 
-  let args = { "torchserve": torchserveFlag }
+  let args = { "torchserve": torchserveFlag, "debug_artifacts": debugArtifactsFlag }
 
   if (req.corner_points)
     args.corner_points = req.corner_points
 
-  // Send the image to the Python code to be processed
-  let output = await pyconnect.run('BCE.py', args, sampleFile)
+  if (req.image_token)
+    args.image_token = req.image_token
+
+  // A worker keeps the decoded image under this ID for /reread. The image
+  // token is reused, so a scan of the same image replaces the previous one.
+  // Without workers, nothing outlives the request.
+  let scanId = (pyconnect.workersRunning()) ? req.image_token || crypto.randomUUID() : null
+
+  if (scanId)
+    args.scan_id = scanId
+
+  // Send the image to the Python code to be processed. Requests for the same
+  // image are sent to the same worker when possible, since it may have already
+  // decoded the image.
+  let output = await pyconnect.run('BCE.py', args, sampleFile, scanId || req.image_token)
+
+  if (output.status === 200 && scanId)
+    res.set('Scan-Id', scanId)
 
   res.status(output.status).json(output.body)
 });
@@ -174,8 +291,36 @@ app.post('/corners', validateImage, async (req, res) => {
   // The name of the input field (i.e. "imageFile") is used to retrieve the uploaded file
   let imageFile = req.files.image;
 
+  // Keep the image, so it does not need to be uploaded again for /bce or /ctr
+  let imageToken = imageStore.put(imageFile)
+
+  // A worker decodes the image once for both this request and the /bce or
+  // /ctr request that uses the token (they are sent to the same worker)
+  let args = (imageToken && pyconnect.workersRunning()) ? { "image_token": imageToken } : null
+
   // Send the image to the Python code to be processed
-  let output = await pyconnect.run('corners.py', null, imageFile)
+  let output = await pyconnect.run('corners.py', args, imageFile, imageToken)
+
+  if (output.status === 200 && imageToken)
+    output.body.image_token = imageToken
+
+  res.status(output.status).json(output.body)
+});
+
+
+app.post('/reread', validateReread, async (req, res) => {
+  // Only the Python workers keep the scans
+  if (!pyconnect.workersRunning()) {
+    let errorMessage = 'Re-reading a field needs the Python workers (see PYTHON_WORKERS)'
+    console.warn(errorMessage)
+    return res.status(503).json({'error': errorMessage});
+  }
+
+  let args = req.reread_args
+  args.torchserve = torchserveFlag
+
+  // Only the worker that processed the scan has its page, so wait for it
+  let output = await pyconnect.run('reread.py', args, null, args.scan_id, true)
 
   res.status(output.status).json(output.body)
 });
@@ -1,5 +1,7 @@
 import sys
+import os
 import json
+import struct
 from contextlib import redirect_stdout, redirect_stderr
 from os import devnull
 import importlib.util
@@ -7,10 +9,23 @@ from pathlib import Path
 
 from preprocessing.exceptions import *
 from OCR.exceptions import *
+from ImageCache import ScanLookupError
+import ThreadBudget
+
+
+# The scripts that a worker loads before it receives its first request
+PRELOAD_SCRIPTS = ['corners.py', 'BCE.py', 'CTR.py']
+
+# Every frame starts with the length of its JSON header (4-byte big-endian)
+FRAME_HEADER = struct.Struct('>I')
 
 
 def main():
 
+    if len(sys.argv) == 2 and sys.argv[1] == '--worker':
+        worker_main()
+        return
+
     # Receive from parent process
     script_name, args, image_buffer = receive()
 
@@ -23,12 +38,87 @@ def main():
 
                 print('ERROR if you see this message')
 
+                ThreadBudget.apply()
+
                 result = run_code(script_name, args, image_buffer)
 
     # Send to parent process
     send(result)
 
 
+def worker_main():
+    """
+    Runs as a long-lived worker. Requests are read from stdin and responses
+    are written to stdout, one frame at a time, until stdin is closed.
+
+    A request frame is a JSON header followed by the raw image bytes:
+
+        [4-byte header length][{"script", "args", "length"}][image bytes]
+
+    A response frame is the same JSON dictionary that the single-shot mode
+    prints, prefixed with its length.
+    """
+
+    # Keep the real stdout for the protocol and point file descriptor 1 at
+    # the null device, so messages printed by native code (OpenCV, torch)
+    # can't corrupt the response frames.
+    protocol_out = os.fdopen(os.dup(sys.stdout.fileno()), 'wb')
+    protocol_in = sys.stdin.buffer
+
+    null_fd = os.open(devnull, os.O_WRONLY)
+    os.dup2(null_fd, sys.stdout.fileno())
+    os.close(null_fd)
+
+    with open(devnull, 'w') as null_device:
+        with redirect_stdout(null_device):
+
+            warm_up()
+
+            # Limit the threads now that OpenCV and PyTorch are loaded
+            ThreadBudget.apply()
+
+            while True:
+
+                request = receive_frame(protocol_in)
+
+                if request is None:
+                    # The parent closed stdin; time to exit
+                    break
+
+                script_name, args, image_buffer = request
+
+                try:
+                    result = run_code(script_name, args, image_buffer)
+
+                except Exception as e:
+                    # Unlike the single-shot mode, a worker has to survive
+                    # errors that were not anticipated by run_code.
+                    result = {
+                        'status': -3,
+                        'data': {},
+                        'message': f'{type(e).__name__}: {e}'
+                    }
+
+                send_frame(protocol_out, result)
+
+
+def warm_up():
+    """
+    Loads the image processing scripts and lets them initialize anything that
+    is expensive to create (e.g. the classifier model) before the first
+    request arrives.
+    """
+
+    torchserve = os.environ.get('TORCHSERVE', '').lower() == 'torchserve'
+
+    for script_name in PRELOAD_SCRIPTS:
+
+        module = load_module(script_name)
+
+        if callable(getattr(module, 'warm_up', None)):
+            module.warm_up({'torchserve': torchserve})
+
+
 def run_code(script_name, args, image_buffer):
     """
     Runs the image processing code based on the scorecard type.
@@ -68,6 +158,9 @@ def run_code(script_name, args, image_buffer):
     except OkraModelError as e:
         return error_response(4, e)
 
+    except ScanLookupError as e:
+        return error_response(5, e)
+
     return { 'status': 0, 'data': data, 'message': 'Success' }
 
 
@@ -149,14 +242,121 @@ def send(data):
     print(json.dumps(data))
 
 
+def receive_frame(stream):
+    """
+    Receives a single request frame from the parent JavaScript process.
+
+    Parameters:
+        stream (io.BufferedReader): The stream to read from.
+
+    Returns:
+        str: The name of the Python script to run
+        dict: A dictionary with arguments to pass to the Python script
+        bytes: A byte array storing an image.
+        None: The stream was closed.
+
+    Raises:
+        ValueError: The frame is malformed.
+    """
+
+    raw_length = read_exactly(stream, FRAME_HEADER.size)
+
+    if raw_length is None:
+        return None
+
+    header_length, = FRAME_HEADER.unpack(raw_length)
+    raw_header = read_exactly(stream, header_length)
+
+    if raw_header is None:
+        raise ValueError('Stream closed while reading a frame header')
+
+    header = json.loads(raw_header)
+
+    script_name = header['script']
+
+    if script_name[-3:].lower() != '.py':
+        raise ValueError('Script name should have file extension of ".py"')
+
+    input_length_bytes = int(header.get('length', 0))
+
+    if input_length_bytes < 0:
+        raise ValueError('Expected image length to be positive')
+
+    if input_length_bytes > 0:
+
+        image_buffer = read_exactly(stream, input_length_bytes)
+
+        if image_buffer is None:
+            raise ValueError('Stream closed while reading image data')
+
+    else:
+        image_buffer = None
+
+    return script_name, header.get('args'), image_buffer
+
+
+def read_exactly(stream, length):
+    """Reads exactly 'length' bytes or returns None at the end of the stream"""
+
+    chunks = []
+
+    while length > 0:
+
+        chunk = stream.read(length)
+
+        if not chunk:
+            return None
+
+        chunks.append(chunk)
+        length -= len(chunk)
+
+    return b''.join(chunks)
+
+
+def send_frame(stream, data):
+    """
+    Sends a single response frame to the parent JavaScript process.
+
+    Parameters:
+        stream (io.BufferedWriter): The stream to write to.
+        data (dict): The response data stored in a dictionary object.
+    """
+
+    body = json.dumps(data).encode('utf-8')
+
+    stream.write(FRAME_HEADER.pack(len(body)))
+    stream.write(body)
+    stream.flush()
+
+
+# Modules that have already been loaded by this process
+__loaded_modules = {}
+
+
 def load_module(module_name):
-    """Dynamically loads a Python module"""
+    """Dynamically loads a Python module (once per process)"""
+
+    if module_name in __loaded_modules:
+        return __loaded_modules[module_name]
 
     path = Path(__file__).parent / module_name
 
-    spec = importlib.util.spec_from_file_location(module_name[:-3], path)
-    module = importlib.util.module_from_spec(spec)
-    spec.loader.exec_module(module)
+    if not path.is_file():
+        raise FileNotFoundError(path)
+
+    # A script that was already imported by another script is reused, so
+    # they share the same state (e.g. reread.py imports BCE.py)
+    module = sys.modules.get(module_name[:-3])
+
+    if module is None or Path(getattr(module, '__file__', '')).resolve() != path.resolve():
+
+        spec = importlib.util.spec_from_file_location(module_name[:-3], path)
+        module = importlib.util.module_from_spec(spec)
+
+        sys.modules[module_name[:-3]] = module
+        spec.loader.exec_module(module)
+
+    __loaded_modules[module_name] = module
 
     return module
 
@@ -1,9 +1,30 @@
 const { spawn } = require('child_process');
+const os = require('os')
+const { PythonWorkerPool } = require('./pyworkers')
 
 
 // The command to run Python
 const pythonCommand = (process.env.PYTHON_CMD) ? process.env.PYTHON_CMD : 'python3'
 
+// The number of long-lived Python workers (0 spawns a new process per request)
+const workerCount = (process.env.PYTHON_WORKERS) ? parseInt(process.env.PYTHON_WORKERS) : 0
+
+// The number of requests a worker serves before it is replaced (0 for no limit)
+const workerMaxRequests = (process.env.PYTHON_WORKER_MAX_REQUESTS) ? parseInt(process.env.PYTHON_WORKER_MAX_REQUESTS) : 0
+
+// The number of threads each Python process may use (see ThreadBudget.py). By
+// default, the cores are split evenly between the workers. Without workers,
+// the threads are only limited if this is set.
+const threadsPerProcess = (process.env.PYTHON_THREADS_PER_WORKER)
+    ? parseInt(process.env.PYTHON_THREADS_PER_WORKER)
+    : (workerCount > 0) ? Math.max(1, Math.floor(os.cpus().length / workerCount)) : 0
+
+// The environment of the Python processes
+const pythonEnv = threadEnvironment(threadsPerProcess)
+
+// The worker pool (only created by startWorkers)
+let workerPool = null
+
 // The default error response if something goes wrong
 const defaultErrorResponse = { 'body': { 'error': 'An error occured while processing your request' }, 'status': 500 }
 
@@ -11,11 +32,88 @@ const defaultErrorResponse = { 'body': { 'error': 'An error occured while proces
 //
 // Call a Python script
 //
+// If an affinity key is given (optional), calls with the same key are sent to
+// the same Python worker whenever possible. If 'pinned' is true, the call waits
+// for that worker to be available instead.
+//
 // Returns a promise!!! 'await' a JSON object
 //
-exports.run = function (script, arguments, image)
+exports.run = function (script, arguments, image, affinityKey, pinned = false)
+{
+    return runScript(script, arguments, image, affinityKey, pinned)
+}
+
+
+//
+// Starts the pool of pre-warmed Python workers if PYTHON_WORKERS is set
+//
+exports.startWorkers = function ()
+{
+    if (workerCount > 0 && !workerPool)
+    {
+        workerPool = new PythonWorkerPool({
+            command: pythonCommand,
+            env: pythonEnv,
+            size: workerCount,
+            maxRequests: workerMaxRequests
+        })
+
+        workerPool.start()
+    }
+}
+
+
+//
+// Returns true if the Python workers are running. Only workers keep images
+// and scans between requests.
+//
+exports.workersRunning = function ()
+{
+    return workerPool !== null
+}
+
+
+//
+// Finishes all queued requests and stops the Python workers
+//
+// Returns a promise!!!
+//
+exports.stopWorkers = function ()
+{
+    if (!workerPool)
+    {
+        return Promise.resolve()
+    }
+
+    return workerPool.drain()
+}
+
+
+//
+// Returns the environment for Python processes that may use 'threads' threads
+// (0 for no limit). The BLAS and OpenMP libraries read these variables when
+// they are loaded, and ThreadBudget.py applies PYTHON_THREADS to OpenCV and
+// PyTorch.
+//
+function threadEnvironment(threads)
 {
-    return runScript(script, arguments, image)
+    if (!(threads > 0))
+    {
+        return process.env
+    }
+
+    let env = { ...process.env, PYTHON_THREADS: String(threads) }
+
+    for (let variable of ['OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'NUMEXPR_NUM_THREADS', 'VECLIB_MAXIMUM_THREADS', 'OKRA_ONNX_THREADS'])
+    {
+        // Explicit settings take precedence
+        if (!process.env[variable])
+        {
+            env[variable] = String(threads)
+        }
+    }
+
+    return env
 }
 
 
@@ -30,7 +128,7 @@ function runPythonProcess(script, arguments, image)
 
         // Create the process. Pass the script name and the number of bytes as command line arguments
         //
-        const pythonProcess = spawn(pythonCommand, ['jsconnect.py', script, imageSize, JSON.stringify(arguments)])
+        const pythonProcess = spawn(pythonCommand, ['jsconnect.py', script, imageSize, JSON.stringify(arguments)], { env: pythonEnv })
 
         let result = ''
         let errResult = ''
@@ -91,12 +189,19 @@ function runPythonProcess(script, arguments, image)
 //
 // Calls the process creation function and parses its outputs
 //
-async function runScript(script, arguments, image)
+async function runScript(script, arguments, image, affinityKey, pinned)
 {
     try
     {
         // Run Python code
-        var output = await runPythonProcess(script, arguments, image)
+        if (workerPool)
+        {
+            var output = await workerPool.run(script, arguments, image, affinityKey, pinned)
+        }
+        else
+        {
+            var output = await runPythonProcess(script, arguments, image)
+        }
     }
     catch (e)
     {
@@ -188,6 +293,14 @@ function processReturnValue(val)
 
         return defaultErrorResponse
     }
+    else if (val.status === 5)
+    {
+        //
+        // Exit Status 5: The scan is not cached by the worker
+        //
+
+        var statusCode = 404
+    }
     else
     {
         //
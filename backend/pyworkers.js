@@ -0,0 +1,369 @@
+const { spawn } = require('child_process');
+
+
+// Every frame starts with the length of its JSON header (4-byte big-endian)
+const frameHeaderSize = 4
+
+// The minimum time between restarts of a crashed worker (milliseconds)
+const restartDelay = 1000
+
+// The number of affinity keys remembered by the pool
+const maxAffinityKeys = 1000
+
+
+//
+// A single long-lived Python process running 'jsconnect.py --worker'
+//
+class PythonWorker
+{
+    constructor(pool)
+    {
+        this.pool = pool
+        this.job = null
+        this.requestCount = 0
+        this.retiring = false
+        this.buffer = Buffer.alloc(0)
+
+        this.process = spawn(pool.command, ['jsconnect.py', '--worker'], { env: pool.env })
+
+        this.process.stdout.on('data', (data) => this.receive(data))
+
+        // Python errors and warnings are logged instead of being returned
+        this.process.stderr.on('data', (data) => {
+
+            console.warn(`(Python worker ${this.process.pid}) ${data}`)
+        })
+
+        this.process.stdin.on('error', (err) => {
+
+            console.warn(`(${__filename}) ${err}`)
+        })
+
+        this.process.on('error', (err) => {
+
+            console.error(`(${__filename}) ${err}`)
+        })
+
+        this.process.on('exit', (code, signal) => this.pool.workerExited(this, code, signal))
+    }
+
+    //
+    // Sends a request frame to the worker
+    //
+    send(job)
+    {
+        this.job = job
+
+        let image = job.image
+        let imageSize = (image) ? image.size : 0
+
+        let header = Buffer.from(JSON.stringify({
+            'script': job.script,
+            'args': job.args,
+            'length': imageSize
+        }))
+
+        let length = Buffer.alloc(frameHeaderSize)
+        length.writeUInt32BE(header.length)
+
+        this.process.stdin.write(length)
+        this.process.stdin.write(header)
+
+        if (image)
+        {
+            this.process.stdin.write(image.data)
+        }
+    }
+
+    //
+    // Collects response data until a full frame has arrived
+    //
+    receive(data)
+    {
+        this.buffer = Buffer.concat([this.buffer, data])
+
+        while (this.buffer.length >= frameHeaderSize)
+        {
+            let bodyLength = this.buffer.readUInt32BE(0)
+
+            if (this.buffer.length < frameHeaderSize + bodyLength)
+            {
+                break
+            }
+
+            let body = this.buffer.toString('utf8', frameHeaderSize, frameHeaderSize + bodyLength)
+            this.buffer = this.buffer.subarray(frameHeaderSize + bodyLength)
+
+            let job = this.job
+            this.job = null
+            this.requestCount++
+
+            if (job)
+            {
+                job.accept(body)
+            }
+
+            this.pool.workerIdle(this)
+        }
+    }
+
+    //
+    // Closes stdin. The worker exits after finishing its current request.
+    //
+    retire()
+    {
+        this.retiring = true
+        this.process.stdin.end()
+    }
+}
+
+
+//
+// A pool of pre-warmed Python workers. Requests are queued until a worker is
+// available. Workers that crash are replaced, and workers that reach the
+// request limit are retired and replaced.
+//
+class PythonWorkerPool
+{
+    constructor(options)
+    {
+        this.command = options.command
+        this.env = options.env
+        this.size = options.size
+        this.maxRequests = options.maxRequests
+        this.workers = new Set()
+        this.idle = []
+        this.queue = []
+        this.draining = false
+        this.drainCallbacks = []
+
+        // The worker that last ran a job for each affinity key
+        this.affinity = new Map()
+    }
+
+    //
+    // Starts all the workers
+    //
+    start()
+    {
+        while (this.workers.size < this.size)
+        {
+            this.startWorker()
+        }
+    }
+
+    startWorker()
+    {
+        let worker = new PythonWorker(this)
+        this.workers.add(worker)
+        this.idle.push(worker)
+    }
+
+    //
+    // Runs a script in the next available worker
+    //
+    // Jobs with the same affinity key (optional) are sent to the same worker
+    // when it is idle, so the worker can reuse what it cached for that key.
+    // Pinned jobs wait for that worker instead, unless it is gone.
+    //
+    // Returns a promise that resolves to the raw JSON string sent by Python
+    //
+    run(script, args, image, affinityKey, pinned = false)
+    {
+        return new Promise((accept, reject) => {
+
+            if (this.draining)
+            {
+                reject('The Python worker pool is shutting down')
+                return
+            }
+
+            this.queue.push({ script, args, image, affinityKey, pinned, accept, reject })
+            this.dispatch()
+        })
+    }
+
+    //
+    // Hands queued jobs to idle workers
+    //
+    dispatch()
+    {
+        let i = 0
+
+        while (i < this.queue.length && this.idle.length > 0)
+        {
+            let job = this.queue[i]
+            let worker = this.takeIdleWorker(job.affinityKey, job.pinned)
+
+            if (!worker)
+            {
+                // The job waits for its worker to finish
+                i++
+                continue
+            }
+
+            this.queue.splice(i, 1)
+
+            if (job.affinityKey)
+            {
+                this.rememberAffinity(job.affinityKey, worker)
+            }
+
+            worker.send(job)
+        }
+
+        if (this.draining && this.queue.length === 0)
+        {
+            // Nothing is left for the idle workers to do
+            for (let worker of this.idle)
+            {
+                worker.retire()
+            }
+
+            this.idle = []
+        }
+
+        this.checkDrained()
+    }
+
+    //
+    // Removes a worker from the idle list, preferring the worker that last ran
+    // a job with the same affinity key
+    //
+    // Returns null if the job is pinned and its worker is busy
+    //
+    takeIdleWorker(affinityKey, pinned)
+    {
+        let preferred = this.affinity.get(affinityKey)
+        let index = this.idle.indexOf(preferred)
+
+        if (index < 0)
+        {
+            if (pinned && preferred && !preferred.retiring)
+            {
+                return null
+            }
+
+            index = 0
+        }
+
+        return this.idle.splice(index, 1)[0]
+    }
+
+    rememberAffinity(affinityKey, worker)
+    {
+        // Re-insert the key so the oldest keys are forgotten first
+        this.affinity.delete(affinityKey)
+        this.affinity.set(affinityKey, worker)
+
+        if (this.affinity.size > maxAffinityKeys)
+        {
+            this.affinity.delete(this.affinity.keys().next().value)
+        }
+    }
+
+    //
+    // Called by a worker once it has sent its response
+    //
+    workerIdle(worker)
+    {
+        if (this.maxRequests > 0 && worker.requestCount >= this.maxRequests)
+        {
+            // Replace the worker once it has served enough requests
+            worker.retire()
+
+            if (!this.draining)
+            {
+                this.startWorker()
+            }
+        }
+        else
+        {
+            // When draining, dispatch() retires it once the queue is empty
+            this.idle.push(worker)
+        }
+
+        this.dispatch()
+    }
+
+    //
+    // Called when a worker process exits
+    //
+    workerExited(worker, code, signal)
+    {
+        this.workers.delete(worker)
+        this.idle = this.idle.filter((w) => w !== worker)
+
+        for (let [key, w] of this.affinity)
+        {
+            if (w === worker)
+            {
+                this.affinity.delete(key)
+            }
+        }
+
+        if (worker.job)
+        {
+            worker.job.reject(`Python worker exited while processing a request (code: ${code}, signal: ${signal})`)
+            worker.job = null
+        }
+
+        if (!worker.retiring && !this.draining)
+        {
+            console.error(`Python worker ${worker.process.pid} crashed (code: ${code}, signal: ${signal}); restarting`)
+
+            setTimeout(() => {
+
+                if (!this.draining && this.workers.size < this.size)
+                {
+                    this.startWorker()
+                    this.dispatch()
+                }
+            }, restartDelay)
+        }
+
+        this.checkDrained()
+    }
+
+    //
+    // Stops accepting requests, finishes the queued ones, and shuts down all
+    // the workers.
+    //
+    // Returns a promise that resolves once every worker has exited
+    //
+    drain()
+    {
+        return new Promise((accept) => {
+
+            this.draining = true
+            this.drainCallbacks.push(accept)
+
+            // Idle workers are retired as soon as the queue is empty
+            this.dispatch()
+        })
+    }
+
+    checkDrained()
+    {
+        if (this.draining && this.workers.size === 0)
+        {
+            // Anything still queued can no longer be processed
+            for (let job of this.queue)
+            {
+                job.reject('The Python worker pool shut down before processing the request')
+            }
+
+            this.queue = []
+
+            for (let callback of this.drainCallbacks)
+            {
+                callback()
+            }
+
+            this.drainCallbacks = []
+        }
+    }
+}
+
+
+exports.PythonWorkerPool = PythonWorkerPool
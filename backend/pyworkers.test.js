@@ -0,0 +1,85 @@
+// The fake Python processes started by the pool, in order
+const mockProcesses = []
+
+jest.mock('child_process', () => ({
+
+    spawn: () => {
+
+        const { EventEmitter } = require('events')
+        const { PassThrough } = require('stream')
+
+        let child = new EventEmitter()
+
+        child.pid = mockProcesses.length
+        child.stdin = new PassThrough()
+        child.stdout = new PassThrough()
+        child.stderr = new PassThrough()
+
+        // A worker exits once its stdin is closed
+        child.stdin.on('finish', () => setImmediate(() => child.emit('exit', 0, null)))
+        child.stdin.resume()
+
+        mockProcesses.push(child)
+
+        return child
+    }
+}))
+
+const { PythonWorkerPool } = require('./pyworkers')
+
+
+// Sends a response frame from a fake worker
+function respond(child, data)
+{
+    let body = Buffer.from(JSON.stringify(data))
+    let length = Buffer.alloc(4)
+    length.writeUInt32BE(body.length)
+
+    child.stdout.write(Buffer.concat([length, body]))
+}
+
+
+test('draining with a pinned job queued behind a busy worker', async () => {
+
+    mockProcesses.length = 0
+
+    let pool = new PythonWorkerPool({ command: 'python3', env: {}, size: 2, maxRequests: 0 })
+    pool.start()
+
+    // The first job is sent to the first worker and remembered for 'scan'
+    let first = pool.run('BCE.py', {}, null, 'scan')
+
+    // The same key waits for the first worker, even though the second is idle
+    let pinned = pool.run('reread.py', {}, null, 'scan', true)
+
+    expect(pool.queue.length).toBe(1)
+    expect(pool.idle.length).toBe(1)
+
+    let drained = pool.drain()
+
+    respond(mockProcesses[0], { status: 0 })
+    await first
+
+    // The pinned job is now running on its worker
+    expect(pool.queue.length).toBe(0)
+    respond(mockProcesses[0], { status: 0 })
+    await pinned
+
+    await drained
+
+    expect(pool.workers.size).toBe(0)
+})
+
+
+test('draining an idle pool', async () => {
+
+    mockProcesses.length = 0
+
+    let pool = new PythonWorkerPool({ command: 'python3', env: {}, size: 2, maxRequests: 0 })
+    pool.start()
+
+    await pool.drain()
+
+    expect(pool.workers.size).toBe(0)
+    await expect(pool.run('BCE.py', {}, null)).rejects.toBeDefined()
+})
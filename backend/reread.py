@@ -0,0 +1,37 @@
+import ImageCache
+import BCE
+import CTR
+
+
+# The scripts that can store scans, keyed by the name stored with the scan
+scan_scripts = {
+    'BCE.py': BCE,
+    'CTR.py': CTR
+}
+
+
+def run(args, image_buffer):
+    """
+    Reads a single score-field of a scoresheet that was processed by this
+    process before, using the decoded image and alignment that were kept for
+    its scan ID.
+
+    Parameters:
+        args (dict): A dictionary containing the arguments:
+                     'scan_id' (str): The scan ID of the scoresheet.
+                     'torchserve' (bool): A flag to specify whether TorchServe
+                                          should be used or not.
+                     The rest of the arguments depend on the type of
+                     scoresheet (see BCE.reread and CTR.reread).
+        image_buffer (bytes): Unused.
+
+    Returns:
+        dict: The value, confidence, and image of the score-field.
+
+    Raises:
+        ScanLookupError: The scan or the score-field is not cached.
+    """
+
+    scan = ImageCache.get_scan(args['scan_id'])
+
+    return scan_scripts[scan['script']].reread(args, scan)
@@ -1,4 +1,5 @@
 const app = require('./index')
+const pyconnect = require('./pyconnect')
 
 const port = process.env.PORT
 const protocol = process.env.PROTOCOL ? process.env.PROTOCOL.toLowerCase() : 'http'
@@ -15,7 +16,7 @@ if (protocol === 'https')
     }
 
     // Create the https server with the certificate and key
-    const server = https.createServer(config, app)
+    var server = https.createServer(config, app)
 
     server.listen(port, () => {
         let timestamp = new Date()
@@ -37,12 +38,12 @@ if (protocol === 'https')
     })
 
     // Listen on port 80
-    http.listen(80)
+    var redirectServer = http.listen(80)
 }
 else if (protocol === 'http')
 {
     // 8080 is the port we are using in the meantime, but may be changed later (probably)
-    app.listen(port, () => {
+    var server = app.listen(port, () => {
         let timestamp = new Date()
         console.log(`[${timestamp}] Server listening on port ${port}`)
     })
@@ -57,3 +58,29 @@ else
     throw `Error: "${protocol}" is not a valid PROTOCOL - see ENV.md`
 }
 
+
+// Start the pre-warmed Python workers (if configured)
+pyconnect.startWorkers()
+
+
+//
+// Stop accepting connections, let the Python workers finish
+// their queued requests, and then exit
+//
+function shutdown(signal)
+{
+    let timestamp = new Date()
+    console.log(`[${timestamp}] Received ${signal}; shutting down`)
+
+    server.close()
+
+    if (redirectServer)
+    {
+        redirectServer.close()
+    }
+
+    pyconnect.stopWorkers().then(() => process.exit(0))
+}
+
+process.once('SIGINT', shutdown)
+process.once('SIGTERM', shutdown)
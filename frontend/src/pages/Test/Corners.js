@@ -10,6 +10,9 @@ function Corners({ imageSrc, imageFile, onSubmitCorners, mode }) {
     const isRotated = useRef(false);
     const originalCorners = useRef(null)
 
+    // The server keeps the image uploaded to /corners, so it does not need to be uploaded again
+    const imageToken = useRef(null)
+
     const [corners, setCorners] = useState(null);
 
     const [draggingCorner, setDraggingCorner] = useState(null);
@@ -218,6 +221,8 @@ function Corners({ imageSrc, imageFile, onSubmitCorners, mode }) {
         const formData = new FormData();
         formData.append("image", imageFile);
 
+        imageToken.current = null;
+
         try {
             const response = await axios.post(apiUrl.concat("/corners"), formData, {
                 headers: { "Content-Type": "multipart/form-data" },
@@ -228,6 +233,10 @@ function Corners({ imageSrc, imageFile, onSubmitCorners, mode }) {
 
             let processedCorners = response.data.corner_points;
 
+            if (response.data.image_token) {
+                imageToken.current = response.data.image_token;
+            }
+
             if (isRotated.current) {
                 originalCorners.current = processedCorners;
                 processedCorners = [
@@ -265,7 +274,13 @@ function Corners({ imageSrc, imageFile, onSubmitCorners, mode }) {
         if (!corners || !imageFile) return;
 
         const formData = new FormData();
-        formData.append('image', imageFile);
+
+        // Refer to the image uploaded to /corners instead of uploading it again
+        if (imageToken.current) {
+            formData.append('image_token', imageToken.current);
+        } else {
+            formData.append('image', imageFile);
+        }
 
         if (isRotated.current) {
             console.log("These are the corner values BEFORE an inverse rotation is applied:");
@@ -290,12 +305,29 @@ function Corners({ imageSrc, imageFile, onSubmitCorners, mode }) {
         try {
             // const response = await axios.post(apiUrl.concat('/bce'), formData);
 
-            const response = await axios.post(apiUrl.concat(`/${mode}`), formData, {
+            const uploadOptions = {
                 onUploadProgress: (progressEvent) => {
                     const percentCompleted = Math.round((progressEvent.loaded * 100) / progressEvent.total);
                     setProgress(percentCompleted);
                 }
-            });
+            };
+
+            let response;
+
+            try {
+                response = await axios.post(apiUrl.concat(`/${mode}`), formData, uploadOptions);
+            } catch (error) {
+                // The server no longer has the image, so upload it again
+                if (!formData.has('image_token') || !error.response || error.response.status !== 404) {
+                    throw error;
+                }
+
+                imageToken.current = null;
+                formData.delete('image_token');
+                formData.append('image', imageFile);
+
+                response = await axios.post(apiUrl.concat(`/${mode}`), formData, uploadOptions);
+            }
 
             console.log("Here is the rider data:");
             console.log(response.data);